@@ -1,26 +1,36 @@
-from flask import Flask, request, jsonify, render_template, Response, make_response
+from flask import Flask, request, jsonify, render_template, Response, make_response, g
 import subprocess
 import json
 import sys
 import os
 import csv
+import io
 from datetime import datetime, timedelta
 import threading
 import time
-import serial
-from fpdf import FPDF
+import metrics
+import archive
+import numpy as np
+import prediction_worker
 
 app = Flask(__name__)
+# fpdf, serial, pandas aur xgboost yahan import nahi hote: fpdf/serial jis function mein chahiye wahin,
+# aur pandas/xgboost prediction_worker ke background thread mein. Worker yahin start hota hai taaki
+# `python app.py`, `flask run` ya WSGI server, kaise bhi chalao, /ready bina /predict ke 200 ho jaye.
+worker = prediction_worker.PredictionWorker().start()
 
 # --- Global variable to store sensor data ---
 latest_sensor_data = { "temp": 25.0, "humidity": 50.0, "status": "disconnected" }
 sensor_thread = None
 stop_sensor_thread = threading.Event()
+sensor_recorder = archive.SensorRecorder(kiln='kiln-1') # Readings archive/sensors/kiln-1 mein jaate hain
+SERIAL_PORT = os.environ.get('TIMBER_SERIAL_PORT', 'COM3'); BAUD_RATE = 115200 # replay.py fake device ka port yahan set karta hai
 
 # --- Placeholder function for reading sensor ---
 # (read_sensor_data_loop function remains the same)
 def read_sensor_data_loop():
-    global latest_sensor_data; SERIAL_PORT = 'COM3'; BAUD_RATE = 115200
+    import serial
+    global latest_sensor_data
     while not stop_sensor_thread.is_set():
         ser = None
         try:
@@ -32,22 +42,38 @@ def read_sensor_data_loop():
                     try:
                         data = json.loads(line)
                         if "error" in data:
+                            metrics.SENSOR_READINGS.inc(result='sensor_error')
                             if latest_sensor_data["temp"] != "Error": print(f"(Sensor Thread) Sensor Error: {data['error']}")
                             latest_sensor_data["temp"] = "Error"; latest_sensor_data["humidity"] = "Error"; latest_sensor_data["status"] = "error"
                         else:
                             latest_sensor_data["temp"] = round(float(data['temp']), 1); latest_sensor_data["humidity"] = round(float(data['humidity']), 1); latest_sensor_data["status"] = "connected"
-                    except (json.JSONDecodeError, ValueError, TypeError) as e: pass
+                            metrics.SENSOR_READINGS.inc(result='ok'); sensor_recorder.add(latest_sensor_data["temp"], latest_sensor_data["humidity"])
+                    except (json.JSONDecodeError, ValueError, TypeError, KeyError) as e: metrics.SENSOR_READINGS.inc(result='invalid')
                 time.sleep(0.1)
         except serial.SerialException:
+            metrics.SENSOR_RECONNECTS.inc()
             if latest_sensor_data["status"] != "disconnected": print(f"(Sensor Thread) Port {SERIAL_PORT} disconnected. Retrying..."); latest_sensor_data["status"] = "disconnected"; latest_sensor_data["temp"] = "N/A"; latest_sensor_data["humidity"] = "N/A"
         except Exception as e:
              if latest_sensor_data["status"] != "error": print(f"(Sensor Thread) An unexpected error occurred: {e}"); latest_sensor_data["status"] = "error"
         finally:
              if ser and ser.is_open: ser.close()
         if not stop_sensor_thread.is_set(): time.sleep(5)
+    sensor_recorder.flush()
     print("(Sensor Thread) Stopped.")
 
 
+# --- NAYA: Request timing (metrics.py) ---
+@app.before_request
+def start_request_timer(): g.request_start = time.perf_counter()
+
+@app.teardown_request
+def record_request_latency(exc):
+    start = g.pop('request_start', None)
+    if start is None: return
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+
+
 # --- Webpage Routes ---
 @app.route('/')
 def home(): return render_template('index.html')
@@ -69,26 +95,58 @@ def predict():
         except (ValueError, TypeError): temp_c = 25.0
         try: humidity_rh = float(latest_sensor_data["humidity"])
         except (ValueError, TypeError): humidity_rh = 50.0
-        command = [ sys.executable, 'predict.py', species, str(thickness), str(initial_mc), str(target_mc), str(temp_c), str(humidity_rh) ]
-        result = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8', errors='ignore')
-        return jsonify({'success': True, 'prediction_output': result.stdout})
-    except subprocess.CalledProcessError as e: return jsonify({'success': False, 'error': e.stderr or e.stdout})
+        # --- NAYA (v3.1): Subprocess nahi, pehle se loaded model (prediction_worker.py) ---
+        with metrics.Timer(metrics.MODEL_INFERENCE): prediction_output, model_version = worker.predict(species, thickness, initial_mc, target_mc, temp_c, humidity_rh)
+        return jsonify({'success': True, 'prediction_output': prediction_output, 'model_version': model_version})
     except Exception as e: return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/log_prediction', methods=['POST'])
 def log_prediction():
     try:
-        data = request.json; log_file = 'prediction_log.csv'; file_exists = os.path.isfile(log_file)
-        with open(log_file, 'a', newline='', encoding='utf-8') as f:
-            headers = ['Timestamp', 'Species', 'Thickness_cm', 'Initial_Moisture', 'Target_Moisture', 'Temperature_C', 'Humidity_RH', 'Predicted_Hours']
-            writer = csv.DictWriter(f, fieldnames=headers, extrasaction='ignore')
-            if not file_exists or os.path.getsize(log_file) == 0: writer.writeheader()
-            timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            row_data = { 'Timestamp': timestamp_str, 'Species': data.get('species'), 'Thickness_cm': data.get('thickness'), 'Initial_Moisture': data.get('initial_mc'), 'Target_Moisture': data.get('target_mc'), 'Temperature_C': data.get('temp_c'), 'Humidity_RH': data.get('humidity_rh'), 'Predicted_Hours': data.get('predicted_hours') }
-            writer.writerow(row_data)
+        data = request.json; log_file = 'prediction_log.csv'
+        with archive.log_file_lock:
+            archive.upgrade_log(log_file); batch_number = archive.next_batch_number(log_file) # Har row ka apna stable batch number
+            with open(log_file, 'a', newline='', encoding='utf-8') as f:
+                file_exists = f.tell() > 0
+                headers = archive.LOG_HEADERS
+                writer = csv.DictWriter(f, fieldnames=headers, extrasaction='ignore')
+                if not file_exists: writer.writeheader()
+                timestamp_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                row_data = { 'Timestamp': timestamp_str, 'Species': data.get('species'), 'Thickness_cm': data.get('thickness'), 'Initial_Moisture': data.get('initial_mc'), 'Target_Moisture': data.get('target_mc'), 'Temperature_C': data.get('temp_c'), 'Humidity_RH': data.get('humidity_rh'), 'Predicted_Hours': data.get('predicted_hours'), 'Model_Version': data.get('model_version', 'unknown'), 'Batch_Number': batch_number }
+                writer.writerow(row_data)
         return jsonify({'success': True, 'message': 'Logged successfully!'})
     except Exception as e: return jsonify({'success': False, 'error': f"Logging failed: {e}"})
 
+# --- NAYA (v3.0): Online model refresh ---
+# Jab batch sach mein dry ho jaye, operator actual hours (aur final moisture, agar measure kiya) yahan bhejta hai
+@app.route('/log_actual', methods=['POST'])
+def log_actual():
+    try:
+        data = request.json; actuals_file = 'actual_readings.csv'; file_exists = os.path.isfile(actuals_file)
+        timestamp_str = data['timestamp']; datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S'); actual_hours = float(data['actual_hours'])
+        if actual_hours <= 0: return jsonify({'success': False, 'error': "actual_hours must be positive"})
+        final_mc = data.get('final_mc'); final_mc = float(final_mc) if final_mc not in (None, '') else ''
+        with open(actuals_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['Timestamp', 'Actual_Hours', 'Final_Moisture'])
+            if not file_exists or os.path.getsize(actuals_file) == 0: writer.writeheader()
+            writer.writerow({ 'Timestamp': timestamp_str, 'Actual_Hours': actual_hours, 'Final_Moisture': final_mc })
+        return jsonify({'success': True, 'message': 'Actual reading logged!'})
+    except (KeyError, ValueError, TypeError) as e: return jsonify({'success': False, 'error': f"Invalid actual reading: {e}"})
+    except Exception as e: return jsonify({'success': False, 'error': f"Logging failed: {e}"})
+
+# retrain_model.py alag process mein chalta hai; naya model os.replace() se swap hota hai,
+# isliye chal rahe /predict requests purana model hi poora use karte hain
+retrain_process = None
+retrain_lock = threading.Lock()
+
+@app.route('/retrain', methods=['POST'])
+def retrain():
+    global retrain_process
+    with retrain_lock:
+        if retrain_process is not None and retrain_process.poll() is None: return jsonify({'success': False, 'error': 'Retraining already in progress.'})
+        retrain_process = subprocess.Popen([sys.executable, 'retrain_model.py'])
+    return jsonify({'success': True, 'message': 'Retraining started in background.'})
+
 # --- NAYA: /get_active_jobs mein SORTING aur BETTER COST ---
 @app.route('/get_active_jobs', methods=['GET'])
 def get_active_jobs():
@@ -97,10 +155,12 @@ def get_active_jobs():
     TEMP_COST_FACTOR = 0.02 # Example: 2% cost increase per degree above 25°C
 
     try:
-        if not os.path.isfile(log_file): return jsonify([])
-        with open(log_file, 'r', encoding='utf-8') as f:
+        read_start = time.perf_counter(); rows_parsed = 0
+        text, _ = archive.log_snapshot(log_file) # Lock ke andar poori file padh li; parsing lock ke bahar
+        with io.StringIO(text) as f:
             reader = csv.DictReader(f, skipinitialspace=True)
-            for i, row in enumerate(reader):
+            for row in reader:
+                rows_parsed += 1
                 try:
                     start_time = datetime.strptime(row['Timestamp'], '%Y-%m-%d %H:%M:%S')
                     predicted_hours = float(row.get('Predicted_Hours', 0))
@@ -124,7 +184,7 @@ def get_active_jobs():
                     # Only add active jobs
                     if not is_ready:
                         jobs.append({
-                            'id': f"B{start_time.strftime('%y%m%d')}{i+1:03d}",
+                            'id': f"B{start_time.strftime('%y%m%d')}{int(row['Batch_Number']):03d}",
                             'species': row.get('Species', 'N/A'),
                             'thickness': row.get('Thickness_cm', 'N/A'),
                             'initial_mc': row.get('Initial_Moisture', 'N/A'),
@@ -136,6 +196,7 @@ def get_active_jobs():
                             'estimated_cost': estimated_cost
                         })
                 except (ValueError, KeyError, TypeError) as e: print(f"Skipping malformed row in active jobs: {row} | Error: {e}"); continue
+        metrics.LOG_READ.observe(time.perf_counter() - read_start, route='/get_active_jobs'); metrics.LOG_ROWS.observe(rows_parsed, route='/get_active_jobs')
 
         # --- NAYA: Sorting ---
         # Pehle un jobs ko rakho jinka end time nazdeek hai
@@ -150,15 +211,25 @@ def get_active_jobs():
 def get_history():
     log_file = 'prediction_log.csv'; completed_jobs = []; now = datetime.now()
     try:
-        if not os.path.isfile(log_file): return jsonify([])
-        with open(log_file, 'r', encoding='utf-8') as f:
+        read_start = time.perf_counter(); rows_parsed = 0
+        # --- NAYA: Archived jobs (sab completed hain) columnar archive se, bina text parsing ke ---
+        # Archive aur CSV ek hi lock ke andar padhe jaate hain, taaki beech mein rollup hone par koi job chhoote ya do baar na aaye
+        text, archived = archive.log_snapshot(log_file, ['Timestamp', 'Batch_Number', 'Species', 'Initial_Moisture', 'Target_Moisture', 'Predicted_Hours'])
+        if len(archived['Timestamp']):
+            species_names = archive.load_dictionary('species')
+            timestamps = np.char.replace(np.datetime_as_string(archived['Timestamp'].astype('datetime64[s]')), 'T', ' ')
+            for ts, batch_number, species_code, initial_mc, final_mc, hours in zip(timestamps.tolist(), archived['Batch_Number'].tolist(), archived['Species'].tolist(), archived['Initial_Moisture'].tolist(), archived['Target_Moisture'].tolist(), archived['Predicted_Hours'].tolist()):
+                completed_jobs.append({ 'batch_id': f"B{ts[2:4]}{ts[5:7]}{ts[8:10]}{batch_number:03d}", 'timestamp': ts, 'species': species_names[species_code], 'start_time': ts[:16], 'initial_moisture': archive.format_value(initial_mc), 'final_moisture': archive.format_value(final_mc), 'predicted_hours': archive.format_value(hours) })
+        with io.StringIO(text) as f:
             reader = csv.DictReader(f, skipinitialspace=True)
-            for i, row in enumerate(reader):
+            for row in reader:
+                rows_parsed += 1
                 try:
                     start_time_str = row['Timestamp']; start_time = datetime.strptime(start_time_str, '%Y-%m-%d %H:%M:%S'); predicted_hours = float(row['Predicted_Hours']); end_time = start_time + timedelta(hours=predicted_hours)
                     if end_time <= now:
-                        completed_jobs.append({ 'batch_id': f"B{start_time.strftime('%y%m%d')}{i+1:03d}", 'timestamp': start_time_str, 'species': row.get('Species', 'N/A'), 'start_time': start_time.strftime('%Y-%m-%d %H:%M'), 'initial_moisture': row.get('Initial_Moisture', 'N/A'), 'final_moisture': row.get('Target_Moisture', 'N/A'), 'predicted_hours': row.get('Predicted_Hours', 'N/A') })
+                        completed_jobs.append({ 'batch_id': f"B{start_time.strftime('%y%m%d')}{int(row['Batch_Number']):03d}", 'timestamp': start_time_str, 'species': row.get('Species', 'N/A'), 'start_time': start_time.strftime('%Y-%m-%d %H:%M'), 'initial_moisture': row.get('Initial_Moisture', 'N/A'), 'final_moisture': row.get('Target_Moisture', 'N/A'), 'predicted_hours': row.get('Predicted_Hours', 'N/A') })
                 except (ValueError, KeyError, TypeError) as e: print(f"Skipping malformed row for history: {row} | Error: {e}"); continue
+        metrics.LOG_READ.observe(time.perf_counter() - read_start, route='/get_history'); metrics.LOG_ROWS.observe(rows_parsed, route='/get_history')
         completed_jobs.sort(key=lambda x: x['start_time'], reverse=True)
         return jsonify(completed_jobs)
     except Exception as e: print(f"Error reading log for history: {e}"); return jsonify([])
@@ -170,15 +241,22 @@ def download_report(timestamp_str):
     try: target_start_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
     except ValueError: return f"Invalid Timestamp format received: {timestamp_str}", 400
     try:
-        if not os.path.isfile(log_file): return "Log file not found", 404
-        with open(log_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, skipinitialspace=True)
-            for row in reader:
-                 try:
-                     if row.get('Timestamp') == timestamp_str: batch_data = row; batch_data['start_time_obj'] = target_start_time; break
-                 except (KeyError): continue
+        read_start = time.perf_counter(); rows_parsed = 0
+        text, _ = archive.log_snapshot(log_file)
+        if text:
+            with io.StringIO(text) as f:
+                reader = csv.DictReader(f, skipinitialspace=True)
+                for row in reader:
+                     rows_parsed += 1
+                     try:
+                         if row.get('Timestamp') == timestamp_str: batch_data = row; break
+                     except (KeyError): continue
+        if batch_data is None: batch_data = archive.find_job(timestamp_str) # Snapshot mein nahi hai toh pehle hi archive ho chuka: wahan mil jayega
+        metrics.LOG_READ.observe(time.perf_counter() - read_start, route='/download_report'); metrics.LOG_ROWS.observe(rows_parsed, route='/download_report')
+        if batch_data is not None: batch_data['start_time_obj'] = target_start_time
         if batch_data is None: return f"Data for timestamp '{timestamp_str}' not found in log.", 404
 
+        from fpdf import FPDF
         pdf = FPDF(); pdf.add_page(); pdf.set_font('Arial', 'B', 16)
         pdf.cell(0, 10, f'Drying Report - {timestamp_str}', 0, 1, 'C'); pdf.ln(10)
         pdf.set_font('Arial', '', 12)
@@ -193,11 +271,57 @@ def download_report(timestamp_str):
     except Exception as e: print(f"Error generating PDF for {timestamp_str}: {e}"); import traceback; traceback.print_exc(); return f"Error generating report for {timestamp_str}", 500
 
 
+# --- NAYA: Completed jobs ko columnar archive mein le jao (server ke andar, taaki log_prediction ke saath lock share ho) ---
+@app.route('/archive_jobs', methods=['POST'])
+def archive_jobs():
+    try: return jsonify({'success': True, 'archived': archive.roll_completed_jobs()})
+    except Exception as e: print(f"Error archiving jobs: {e}"); return jsonify({'success': False, 'error': f"Archiving failed: {e}"})
+
+# Rollup har ARCHIVE_INTERVAL_SECONDS par apne aap chalta hai. Thread module level par start hota hai taaki
+# `python app.py`, `flask run` aur WSGI server, teeno mein chale. TIMBER_ARCHIVE_INTERVAL=0 se band (benchmark.py).
+# Multi-process WSGI mein har worker ka apna thread hota hai; archive.log_file_lock file lock hai, isliye
+# rollups aur /log_prediction processes ke beech bhi ek-ek karke chalte hain (aur dobara roll idempotent hai).
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('TIMBER_ARCHIVE_INTERVAL', '3600'))
+
+def archive_jobs_loop():
+    while True:
+        try: archive.roll_completed_jobs()
+        except Exception as e: print(f"(Archive Thread) Error archiving jobs: {e}")
+        time.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+if ARCHIVE_INTERVAL_SECONDS > 0: threading.Thread(target=archive_jobs_loop, name='job-archiver', daemon=True).start()
+
+
+# --- NAYA (v3.1): Readiness - model load aur warm-up ho gaya ho tabhi 200 ---
+@app.route('/ready', methods=['GET'])
+def ready():
+    state = worker.status(); response = jsonify(state); response.status_code = 200 if state['ready'] else 503
+    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"; return response
+
+
+# --- NAYA: Metrics endpoint (Prometheus text format) ---
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Sampling profiler sirf tab chalega jab server TIMBER_PROFILER=1 ke saath start ho
+# Example: curl "http://127.0.0.1:5000/metrics/profile?seconds=10" > stacks.txt
+@app.route('/metrics/profile', methods=['GET'])
+def metrics_profile():
+    if os.environ.get('TIMBER_PROFILER') != '1': return "Profiler disabled. Start the server with TIMBER_PROFILER=1 to enable it.", 404
+    try: seconds = min(60.0, max(0.1, float(request.args.get('seconds', 5))))
+    except ValueError: return "Invalid 'seconds' value", 400
+    stacks = metrics.sample_stacks(seconds)
+    if stacks is None: return "A profile is already running.", 409
+    return Response(stacks, mimetype='text/plain')
+
+
 # --- Server Start ---
 if __name__ == "__main__":
     # print("Starting sensor reading thread...")
     # sensor_thread = threading.Thread(target=read_sensor_data_loop, daemon=True)
     # sensor_thread.start()
+    print("Prediction model is loading in background (check /ready)...")
     print("Starting Flask server...")
     app.run(debug=True, host='0.0.0.0', use_reloader=False)
 
@@ -0,0 +1,389 @@
+import os
+import csv
+import json
+import time
+import shutil
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+
+# --- Columnar Archive (completed jobs + sensor readings) ---
+# Layout:
+#   archive/species.json                          -> species dictionary (append-only, code = list index)
+#   archive/versions.json                         -> model version dictionary
+#   archive/jobs/2025-01/part-<ns>/<Column>.npy   -> ek column, ek .npy file
+#   archive/sensors/<kiln>/2025-01/part-<ns>/<Column>.npy
+#
+# Timestamps int64 seconds-since-epoch (naive local time, bilkul jaise CSV mein likha hai) hain,
+# species/model version int16 codes. Parts sirf add hote hain: pehle part-*.tmp folder mein
+# likhte hain, phir rename, isliye reader ko kabhi aadha likha part nahi dikhta.
+# Reads np.load(mmap_mode='r') se hote hain: sirf maange gaye columns aur months disk se aate hain.
+#
+# Compaction: har write ke baad, jab ek month mein ek hi size tier (300, 3k, 30k... rows) ke
+# COMPACT_FAN_IN parts ho jayein, unhe ek part mein merge karte hain; month badalne par pichla month
+# poora ek part ban jata hai. Merged part ke andar sources.json purane parts ke naam rakhta hai, aur
+# reader un parts ko skip karta hai - isliye merge ke beech (ya crash ke baad) rows na double hoti hain, na gayab.
+
+ARCHIVE_DIR = 'archive'
+LOG_FILE = 'prediction_log.csv'
+ARCHIVE_AFTER_HOURS = 24 # Job khatam hone ke 24 ghante baad archive hoga (reminder_service ko time mil jaye)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+COMPACT_FAN_IN = 10 # Ek tier mein itne parts hote hi merge
+EPOCH = datetime(1970, 1, 1)
+
+LOG_HEADERS = ['Timestamp', 'Species', 'Thickness_cm', 'Initial_Moisture', 'Target_Moisture', 'Temperature_C', 'Humidity_RH', 'Predicted_Hours', 'Model_Version', 'Batch_Number']
+JOB_FLOAT_COLUMNS = ['Thickness_cm', 'Initial_Moisture', 'Target_Moisture', 'Temperature_C', 'Humidity_RH', 'Predicted_Hours']
+
+class LogFileLock:
+    """threading.Lock + an OS lock (fcntl / msvcrt) on a side file, so several server processes
+    (WSGI workers, retrain_model.py) never rewrite prediction_log.csv under each other."""
+
+    def __init__(self, path):
+        self.path = path; self.thread_lock = threading.Lock(); self.handle = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.handle = open(self.path, 'a+b')
+            if os.name == 'nt':
+                import msvcrt
+                self.handle.seek(0)
+                while True:
+                    try: msvcrt.locking(self.handle.fileno(), msvcrt.LK_LOCK, 1); break
+                    except OSError: pass # LK_LOCK 10 second baad haar maan leta hai; dobara try karo
+            else:
+                import fcntl
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            if self.handle: self.handle.close(); self.handle = None
+            self.thread_lock.release(); raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self.handle.seek(0); msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self.handle.close(); self.handle = None; self.thread_lock.release()
+        return False
+
+
+# log_prediction(), roll_completed_jobs() aur log padhne wale routes isi lock ke saath CSV chhoote hain.
+# Lock file working directory mein banti hai, bilkul prediction_log.csv ki tarah.
+log_file_lock = LogFileLock(LOG_FILE + '.lock')
+dictionary_lock = threading.Lock()
+
+
+def to_epoch(dt): return int((dt - EPOCH).total_seconds())
+
+
+def from_epoch(seconds): return EPOCH + timedelta(seconds=int(seconds))
+
+
+def month_key(epoch_seconds): return from_epoch(epoch_seconds).strftime('%Y-%m')
+
+
+# --- Dictionary encoding ---
+def load_dictionary(name, archive_dir=ARCHIVE_DIR):
+    path = os.path.join(archive_dir, f'{name}.json')
+    if not os.path.isfile(path): return []
+    with open(path, 'r', encoding='utf-8') as f: return json.load(f)
+
+
+def encode_values(name, values, archive_dir=ARCHIVE_DIR):
+    """Returns int16 codes for `values`, adding unseen values to the dictionary file."""
+    with dictionary_lock:
+        entries = load_dictionary(name, archive_dir); index = {value: code for code, value in enumerate(entries)}
+        added = False
+        for value in values:
+            if value not in index: index[value] = len(entries); entries.append(value); added = True
+        if added:
+            os.makedirs(archive_dir, exist_ok=True); path = os.path.join(archive_dir, f'{name}.json')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f: json.dump(entries, f)
+            os.replace(path + '.tmp', path)
+    return np.array([index[value] for value in values], dtype=np.int16)
+
+
+# --- Partitioned parts ---
+def write_month_part(month_dir, columns, sources=None):
+    """Writes one part folder (via a .tmp rename). `sources` = part names this part replaces (compaction)."""
+    part_name = f'part-{time.time_ns()}'; tmp_dir = os.path.join(month_dir, part_name + '.tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, values in columns.items(): np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(values))
+    if sources:
+        with open(os.path.join(tmp_dir, 'sources.json'), 'w', encoding='utf-8') as f: json.dump(sources, f)
+    os.rename(tmp_dir, os.path.join(month_dir, part_name))
+
+
+def write_part(dataset_dir, columns):
+    """Writes `columns` (name -> 1-D array, must include int64 'Timestamp') as new parts, one per month. Returns the month folders written."""
+    timestamps = columns['Timestamp']
+    if len(timestamps) == 0: return []
+    months = np.array([month_key(t) for t in timestamps]); month_dirs = []
+    for month in np.unique(months):
+        mask = months == month; month_dir = os.path.join(dataset_dir, month)
+        write_month_part(month_dir, {name: values[mask] for name, values in columns.items()}); month_dirs.append(month_dir)
+    return month_dirs
+
+
+def month_parts(month_dir):
+    """Returns (visible, superseded) part names: superseded = listed in a merged part's sources.json."""
+    names = sorted(p for p in os.listdir(month_dir) if p.startswith('part-') and not p.endswith('.tmp'))
+    superseded = set()
+    for name in names:
+        try:
+            with open(os.path.join(month_dir, name, 'sources.json'), 'r', encoding='utf-8') as f: superseded.update(json.load(f))
+        except FileNotFoundError: pass
+    return [name for name in names if name not in superseded], [name for name in names if name in superseded]
+
+
+def list_parts(dataset_dir, start=None, end=None):
+    """Part folders whose month overlaps [start, end] (epoch seconds, either may be None)."""
+    if not os.path.isdir(dataset_dir): return []
+    first_month = month_key(start) if start is not None else None; last_month = month_key(end) if end is not None else None
+    parts = []
+    for month in sorted(os.listdir(dataset_dir)):
+        month_dir = os.path.join(dataset_dir, month)
+        if not os.path.isdir(month_dir): continue
+        if (first_month and month < first_month) or (last_month and month > last_month): continue # Partition pruning
+        parts.extend(os.path.join(month_dir, part) for part in month_parts(month_dir)[0])
+    return parts
+
+
+def read_columns(dataset_dir, columns, start=None, end=None):
+    """Reads only `columns` from the needed month partitions. Single-part reads stay memory-mapped (zero-copy)."""
+    load_columns = list(columns) if 'Timestamp' in columns or (start is None and end is None) else list(columns) + ['Timestamp']
+    for attempt in range(3):
+        pieces = {name: [] for name in load_columns}
+        try:
+            for part in list_parts(dataset_dir, start, end):
+                for name in load_columns: pieces[name].append(np.load(os.path.join(part, f'{name}.npy'), mmap_mode='r'))
+            break
+        except FileNotFoundError:
+            if attempt == 2: raise # Listing ke baad compaction ne part hata diya; dobara list karo
+    result = {}
+    for name in load_columns:
+        if not pieces[name]: result[name] = np.array([], dtype=np.int64 if name == 'Timestamp' else np.float64)
+        elif len(pieces[name]) == 1: result[name] = pieces[name][0]
+        else: result[name] = np.concatenate(pieces[name])
+    if start is not None or end is not None:
+        mask = np.ones(len(result['Timestamp']), dtype=bool)
+        if start is not None: mask &= result['Timestamp'] >= start
+        if end is not None: mask &= result['Timestamp'] <= end
+        result = {name: values[mask] for name, values in result.items()}
+    return {name: result[name] for name in columns}
+
+
+def merge_parts(month_dir, names):
+    """Replaces `names` with one part sorted by Timestamp. The merged part becomes visible before the old ones are removed."""
+    parts = [os.path.join(month_dir, name) for name in names]
+    columns = [f[:-4] for f in os.listdir(parts[0]) if f.endswith('.npy')]
+    merged = {column: np.concatenate([np.load(os.path.join(part, f'{column}.npy')) for part in parts]) for column in columns}
+    order = np.argsort(merged['Timestamp'], kind='stable')
+    write_month_part(month_dir, {column: values[order] for column, values in merged.items()}, sources=list(names))
+    for part in parts: shutil.rmtree(part, ignore_errors=True)
+
+
+def compact_month(month_dir, fan_in=COMPACT_FAN_IN):
+    """Size-tiered merge: whenever `fan_in` parts share a tier (rows ~ fan_in**k), merge them. fan_in=None merges the whole month."""
+    if not os.path.isdir(month_dir): return
+    visible, superseded = month_parts(month_dir)
+    for name in superseded: shutil.rmtree(os.path.join(month_dir, name), ignore_errors=True) # Pichle crash ka bacha hua kachra
+    if fan_in is None:
+        if len(visible) > 1: merge_parts(month_dir, visible)
+        return
+    while True:
+        tiers = {}
+        for name in visible:
+            rows = np.load(os.path.join(month_dir, name, 'Timestamp.npy'), mmap_mode='r').shape[0]
+            tiers.setdefault(int(np.log(max(rows, 1)) / np.log(fan_in)), []).append(name)
+        full = next((names for _, names in sorted(tiers.items()) if len(names) >= fan_in), None)
+        if full is None: return
+        merge_parts(month_dir, full); visible = month_parts(month_dir)[0]
+
+
+def compact(dataset_dir):
+    """Merges all parts of each month into one part, so reads of old months are a single mmap per column."""
+    for month in (sorted(os.listdir(dataset_dir)) if os.path.isdir(dataset_dir) else []):
+        compact_month(os.path.join(dataset_dir, month), fan_in=None)
+
+
+# --- Jobs ---
+def jobs_dir(archive_dir=ARCHIVE_DIR): return os.path.join(archive_dir, 'jobs')
+
+
+def archived_batch_numbers(archive_dir=ARCHIVE_DIR):
+    return read_jobs(['Batch_Number'], archive_dir=archive_dir)['Batch_Number']
+
+
+def upgrade_log(log_file=LOG_FILE, archive_dir=ARCHIVE_DIR):
+    """Adds Model_Version / Batch_Number columns to an older log (call with log_file_lock held).
+
+    Batch numbers for old rows continue from the archive, the same numbers the old row-position IDs showed.
+    """
+    if not os.path.isfile(log_file) or os.path.getsize(log_file) == 0: return
+    with open(log_file, 'r', encoding='utf-8', newline='') as f: header = next(csv.reader(f, skipinitialspace=True), [])
+    missing = [name for name in ('Model_Version', 'Batch_Number') if name not in header]
+    if not missing: return
+    with open(log_file, 'r', encoding='utf-8', newline='') as f: rows = list(csv.reader(f, skipinitialspace=True))[1:]
+    archived = archived_batch_numbers(archive_dir); offset = int(archived.max()) if len(archived) else 0
+    new_header = header + missing; width = len(new_header)
+    with open(log_file + '.tmp', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f); writer.writerow(new_header)
+        for i, row in enumerate(rows):
+            # Purani 8-column rows mein khaali version; jo 9-column rows header ke baad likhi gayi thi unka version waise hi rahega
+            row = row[:width] + [''] * (width - len(row))
+            if 'Batch_Number' in missing: row[new_header.index('Batch_Number')] = str(offset + i + 1)
+            writer.writerow(row)
+    os.replace(log_file + '.tmp', log_file); print(f"Added {', '.join(missing)} column(s) to '{log_file}'.")
+
+
+def next_batch_number(log_file=LOG_FILE, archive_dir=ARCHIVE_DIR):
+    """One more than the largest batch number in the log or the archive (call with log_file_lock held, after upgrade_log)."""
+    archived = archived_batch_numbers(archive_dir); last = int(archived.max()) if len(archived) else 0
+    if os.path.isfile(log_file) and os.path.getsize(log_file) > 0:
+        with open(log_file, 'rb') as f:
+            header = next(csv.reader([f.readline().decode('utf-8')], skipinitialspace=True), [])
+            f.seek(max(0, os.path.getsize(log_file) - 4096)); tail = f.read().decode('utf-8', errors='ignore').splitlines()
+        # Rows append order mein hain, isliye CSV ki aakhri row ka number CSV mein sabse bada hai
+        for line in reversed(tail[1:] if len(tail) > 1 else []):
+            row = next(csv.reader([line], skipinitialspace=True), [])
+            try: last = max(last, int(row[header.index('Batch_Number')])); break
+            except (ValueError, IndexError): continue
+    return last + 1
+
+
+def _to_float(value):
+    try: return float(value)
+    except (ValueError, TypeError): return np.nan # Frontend kabhi kabhi "N/A" bhejta hai
+
+
+def format_value(value):
+    """Archived float -> the string the CSV would have shown ('N/A' for missing)."""
+    return 'N/A' if np.isnan(value) else f'{value:g}'
+
+
+def roll_completed_jobs(log_file=LOG_FILE, archive_dir=ARCHIVE_DIR, grace_hours=ARCHIVE_AFTER_HOURS, now=None):
+    """Moves completed jobs out of the CSV into the archive. Returns the number of rows archived.
+
+    Every row carries its own Batch_Number, so finished rows are moved out wherever they are; a long job
+    (or a row that can't be parsed) stays in the CSV without holding back the rows after it.
+    """
+    now = now or datetime.now(); cutoff = now - timedelta(hours=grace_hours)
+    with log_file_lock:
+        if not os.path.isfile(log_file): return 0
+        upgrade_log(log_file, archive_dir)
+        with open(log_file, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f, skipinitialspace=True); fieldnames = list(reader.fieldnames or LOG_HEADERS); rows = list(reader)
+        already_archived = set(archived_batch_numbers(archive_dir).tolist())
+        kept = []; rolled = []; recovered = 0 # rolled = (row, epoch, batch number)
+        for row in rows:
+            try:
+                start_time = datetime.strptime(row['Timestamp'].strip(), TIMESTAMP_FORMAT); batch_number = int(row['Batch_Number'])
+                finished = start_time + timedelta(hours=float(row['Predicted_Hours'])) <= cutoff
+            except (ValueError, KeyError, TypeError, AttributeError, OverflowError): kept.append(row); continue # Kharab row CSV mein hi rahegi
+            if not finished: kept.append(row)
+            elif batch_number in already_archived: recovered += 1 # Pichla roll part likh ke crash hua tha; bas CSV se hatao
+            else: rolled.append((row, to_epoch(start_time), batch_number))
+        if not rolled and not recovered: return 0
+        if recovered: print(f"Removing {recovered} rows already archived by an interrupted roll.")
+
+        if rolled:
+            columns = {
+                'Timestamp': np.array([epoch for _, epoch, _ in rolled], dtype=np.int64),
+                'Batch_Number': np.array([number for _, _, number in rolled], dtype=np.int64),
+                'Species': encode_values('species', [row.get('Species') or 'N/A' for row, _, _ in rolled], archive_dir),
+                'Model_Version': encode_values('versions', [row.get('Model_Version') or 'unknown' for row, _, _ in rolled], archive_dir)
+            }
+            for name in JOB_FLOAT_COLUMNS: columns[name] = np.array([_to_float(row.get(name)) for row, _, _ in rolled], dtype=np.float64)
+            # Commit point: part dikhte hi rows archived hain. Iske baad crash ho toh agla roll inke
+            # Batch_Number archive mein dekh kar sirf CSV se hata dega, dobara archive nahi karega.
+            for month_dir in write_part(jobs_dir(archive_dir), columns): compact_month(month_dir)
+
+        with open(log_file + '.tmp', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore'); writer.writeheader(); writer.writerows(kept)
+        os.replace(log_file + '.tmp', log_file)
+    print(f"Archived {len(rolled)} completed jobs from '{log_file}'.")
+    return len(rolled)
+
+
+def log_snapshot(log_file=LOG_FILE, archive_columns=None, archive_dir=ARCHIVE_DIR):
+    """Returns (CSV text, archived job columns or None), both read under log_file_lock.
+
+    A rollup can't run between the two reads, so every job is in exactly one of them.
+    """
+    with log_file_lock:
+        upgrade_log(log_file, archive_dir)
+        archived = read_jobs(archive_columns, archive_dir=archive_dir) if archive_columns else None
+        if not os.path.isfile(log_file): return '', archived
+        with open(log_file, 'r', encoding='utf-8', newline='') as f: text = f.read()
+    return text, archived
+
+
+def read_jobs(columns, start=None, end=None, archive_dir=ARCHIVE_DIR):
+    return read_columns(jobs_dir(archive_dir), columns, start, end)
+
+
+def find_job(timestamp_str, archive_dir=ARCHIVE_DIR):
+    """Archived job as a CSV-style dict (strings), or None."""
+    try: target = to_epoch(datetime.strptime(timestamp_str, TIMESTAMP_FORMAT))
+    except ValueError: return None
+    columns = read_jobs(['Timestamp', 'Species', 'Model_Version'] + JOB_FLOAT_COLUMNS, start=target, end=target, archive_dir=archive_dir)
+    if len(columns['Timestamp']) == 0: return None
+    species = load_dictionary('species', archive_dir); versions = load_dictionary('versions', archive_dir)
+    row = {'Timestamp': timestamp_str, 'Species': species[int(columns['Species'][0])], 'Model_Version': versions[int(columns['Model_Version'][0])]}
+    for name in JOB_FLOAT_COLUMNS: row[name] = format_value(float(columns[name][0]))
+    return row
+
+
+# --- Sensor readings ---
+def sensors_dir(kiln, archive_dir=ARCHIVE_DIR): return os.path.join(archive_dir, 'sensors', kiln)
+
+
+class SensorRecorder:
+    """Buffers sensor readings in memory and flushes them to the archive in batches."""
+
+    def __init__(self, kiln='kiln-1', archive_dir=ARCHIVE_DIR, flush_every=300, flush_seconds=300):
+        self.kiln = kiln; self.archive_dir = archive_dir; self.flush_every = flush_every; self.flush_seconds = flush_seconds
+        self.buffer = []; self.last_flush = time.monotonic(); self.lock = threading.Lock(); self.month_dir = None
+
+    def add(self, temp_c, humidity_rh, when=None):
+        with self.lock: self.buffer.append((to_epoch(when or datetime.now()), temp_c, humidity_rh))
+        if len(self.buffer) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_seconds: self.flush()
+
+    def flush(self):
+        with self.lock: readings, self.buffer = self.buffer, []; self.last_flush = time.monotonic()
+        if not readings: return
+        try:
+            month_dirs = write_part(sensors_dir(self.kiln, self.archive_dir), {
+                'Timestamp': np.array([r[0] for r in readings], dtype=np.int64),
+                'Temperature_C': np.array([r[1] for r in readings], dtype=np.float32),
+                'Humidity_RH': np.array([r[2] for r in readings], dtype=np.float32)
+            })
+            for month_dir in month_dirs: compact_month(month_dir)
+            # Month badal gaya: pichla month ab band hai, use ek hi part mein merge kar do
+            if self.month_dir and self.month_dir != month_dirs[-1]: compact_month(self.month_dir, fan_in=None)
+            self.month_dir = month_dirs[-1]
+        except OSError as e: print(f"(Sensor Archive) Could not write readings: {e}")
+
+
+def read_sensor_readings(kiln='kiln-1', columns=('Timestamp', 'Temperature_C', 'Humidity_RH'), start=None, end=None, archive_dir=ARCHIVE_DIR):
+    return read_columns(sensors_dir(kiln, archive_dir), list(columns), start, end)
+
+
+if __name__ == "__main__":
+    # python archive.py          -> completed jobs ko CSV se archive mein le jao
+    # python archive.py compact  -> har month ke parts ko ek part mein merge karo
+    # Note: server chal raha ho toh /archive_jobs use karo, taaki log_prediction ke saath lock share ho
+    import sys
+    if len(sys.argv) >= 2 and sys.argv[1] == 'compact':
+        compact(jobs_dir())
+        sensors_root = os.path.join(ARCHIVE_DIR, 'sensors')
+        for kiln in (os.listdir(sensors_root) if os.path.isdir(sensors_root) else []): compact(sensors_dir(kiln))
+        print("Archive compacted.")
+    else:
+        roll_completed_jobs()
@@ -0,0 +1,277 @@
+import os
+import sys
+import csv
+import re
+import json
+import time
+import shutil
+import random
+import argparse
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+# --- Benchmark Suite ---
+# Usage:
+#   python benchmark.py                          -> run everything, save bench_results.json
+#   python benchmark.py --quick                  -> small log sizes, skip training (fast check)
+#   python benchmark.py --save-baseline          -> also store the results as benchmark_baseline.json
+#   python benchmark.py --baseline benchmark_baseline.json --tolerance 0.2
+#                                                -> exit 1 if any metric is >20% worse than the baseline
+#
+# Pehle ek baar --save-baseline se baseline banani padti hai (isi machine par). Baseline file na ho toh
+# run results save karke pass ho jata hai, kisi cheez se compare nahi karta.
+# Sab kuch ek temp folder mein chalta hai, taaki asli prediction_log.csv / model files ko haath na lage.
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+DEFAULT_LOG_SIZES = [1_000, 100_000, 1_000_000]
+QUICK_LOG_SIZES = [1_000, 10_000]
+WORKSPACE_FILES = ['predict.py', 'drying_model.pkl', 'species_categories.pkl', 'generate_data.py', 'train_model.py']
+LOG_HEADERS = ['Timestamp', 'Species', 'Thickness_cm', 'Initial_Moisture', 'Target_Moisture', 'Temperature_C', 'Humidity_RH', 'Predicted_Hours', 'Model_Version', 'Batch_Number']
+
+# Har metric ke saath likha hai ki kam accha hai ya zyada
+LOWER_IS_BETTER = 'lower'
+HIGHER_IS_BETTER = 'higher'
+
+
+def timed(func, repeat):
+    """Runs func `repeat` times and returns the per-call durations in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter(); func(); durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        'median_ms': round(statistics.median(ordered) * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'runs': len(ordered)
+    }
+
+
+def write_synthetic_log(path, n_rows, species_list):
+    """Roughly half the jobs finished in the past, half still drying, like a long-running kiln."""
+    now = datetime.now(); rng = random.Random(42)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f); writer.writerow(LOG_HEADERS)
+        for batch_number in range(1, n_rows + 1):
+            start_time = now - timedelta(hours=rng.uniform(0, 24 * 365))
+            writer.writerow([
+                start_time.strftime('%Y-%m-%d %H:%M:%S'), rng.choice(species_list), round(rng.uniform(1.5, 12.0), 1),
+                round(rng.uniform(35.0, 120.0), 1), round(rng.uniform(8.0, 15.0), 1), round(rng.uniform(25.0, 45.0), 1),
+                round(rng.uniform(40.0, 95.0), 1), round(rng.uniform(10.0, 24 * 365 * 2), 2), 'v0', batch_number
+            ])
+
+
+# --- 1. /predict end-to-end via the Flask test client ---
+def bench_predict_route(client, species, repeat):
+    payload = {'species': species, 'thickness': 5.0, 'initial_mc': 60.0, 'target_mc': 12.0}
+    def call():
+        result = client.post('/predict', json=payload).get_json()
+        if not result.get('success'): raise RuntimeError(f"/predict failed: {result.get('error')}")
+    call() # Pehli call prediction worker ka model load + warm-up karti hai; woh measure_startup.py mein aata hai
+    return summarize(timed(call, repeat))
+
+
+# --- 1b. Metrics hooks overhead on /predict (target: < 1%) ---
+def set_metrics_hooks(app_module, enabled, originals):
+    """Adds/removes app.py's request timer hooks and turns metric updates into no-ops (benchmark only)."""
+    import metrics
+    before = app_module.app.before_request_funcs.setdefault(None, []); teardown = app_module.app.teardown_request_funcs.setdefault(None, [])
+    if enabled:
+        if app_module.start_request_timer not in before: before.append(app_module.start_request_timer)
+        if app_module.record_request_latency not in teardown: teardown.append(app_module.record_request_latency)
+        metrics.Histogram.observe, metrics.Counter.inc = originals
+    else:
+        if app_module.start_request_timer in before: before.remove(app_module.start_request_timer)
+        if app_module.record_request_latency in teardown: teardown.remove(app_module.record_request_latency)
+        metrics.Histogram.observe = lambda self, value, **labels: None; metrics.Counter.inc = lambda self, amount=1, **labels: None
+
+
+def bench_metrics_overhead(app_module, client, species, rounds, calls_per_round=10):
+    """/predict with and without the hooks, in alternating rounds so machine drift hits both sides equally."""
+    import metrics
+    payload = {'species': species, 'thickness': 5.0, 'initial_mc': 60.0, 'target_mc': 12.0}
+    originals = (metrics.Histogram.observe, metrics.Counter.inc); samples = {True: [], False: []}
+    client.post('/predict', json=payload)
+    try:
+        for _ in range(rounds):
+            for enabled in (True, False):
+                set_metrics_hooks(app_module, enabled, originals)
+                samples[enabled].extend(timed(lambda: client.post('/predict', json=payload), calls_per_round))
+    finally:
+        set_metrics_hooks(app_module, True, originals)
+    with_hooks = statistics.median(samples[True]); without_hooks = statistics.median(samples[False])
+    # A/B ka farak run-to-run noise (~1-2%) se chhota hai, isliye ek /predict ke saare metric kaam alag se bhi time karo
+    def hooks_for_one_request():
+        app_module.start_request_timer()
+        with metrics.Timer(metrics.MODEL_INFERENCE): pass
+        metrics.record_cache('model', hit=True); app_module.record_request_latency(None)
+    with app_module.app.test_request_context('/predict', method='POST'):
+        iterations = 10_000; start = time.perf_counter()
+        for _ in range(iterations): hooks_for_one_request()
+        hook_seconds = (time.perf_counter() - start) / iterations
+    return {
+        'with_hooks_ms': round(with_hooks * 1000, 3), 'without_hooks_ms': round(without_hooks * 1000, 3),
+        'ab_difference_pct': round((with_hooks - without_hooks) / without_hooks * 100, 2), 'runs': len(samples[True]),
+        'hook_cost_us': round(hook_seconds * 1e6, 2), 'overhead_pct': round(hook_seconds / without_hooks * 100, 4)
+    }
+
+
+# --- 2. Raw model.predict throughput ---
+def bench_model_predict(species_list, repeat, batch_size):
+    import joblib
+    import pandas as pd
+    model = joblib.load('drying_model.pkl')
+    features = ["Species", "Thickness_cm", "Specific_Gravity", "Initial_Moisture", "Target_Moisture", "Temperature_C", "Humidity_RH"]
+    rng = random.Random(7)
+    rows = [{ "Species": rng.choice(species_list), "Thickness_cm": rng.uniform(1.5, 12.0), "Specific_Gravity": 0.5, "Initial_Moisture": rng.uniform(35.0, 120.0), "Target_Moisture": rng.uniform(8.0, 15.0), "Temperature_C": rng.uniform(25.0, 45.0), "Humidity_RH": rng.uniform(40.0, 95.0) } for _ in range(batch_size)]
+    batch_df = pd.DataFrame(rows)[features]; batch_df['Species'] = pd.Categorical(batch_df['Species'], categories=species_list)
+    single_df = batch_df.iloc[:1]
+    model.predict(single_df) # Warm-up (first call builds internal caches)
+    single = timed(lambda: model.predict(single_df), repeat)
+    batch = timed(lambda: model.predict(batch_df), max(3, repeat // 10))
+    return {
+        'single_row': dict(summarize(single), rows_per_sec=round(1 / statistics.median(single), 1)),
+        'batch': dict(summarize(batch), batch_size=batch_size, rows_per_sec=round(batch_size / statistics.median(batch), 1))
+    }
+
+
+# --- 3. Log query routes against synthetic logs ---
+def bench_log_routes(client, species_list, sizes, repeat):
+    results = {}
+    for n_rows in sizes:
+        write_synthetic_log('prediction_log.csv', n_rows, species_list)
+        runs = repeat if n_rows <= 100_000 else max(1, repeat // 5) # 1M rows ek run mein kaafi time leta hai
+        for route in ('/get_active_jobs', '/get_history'):
+            key = f"{route.strip('/')}_{n_rows}"
+            # Dono routes exception par bhi 200 + [] dete hain; pehle check karo ki asli result aa raha hai
+            response = client.get(route); jobs = response.get_json()
+            if response.status_code != 200 or not jobs: raise RuntimeError(f"{route} returned status {response.status_code} with {len(jobs or [])} jobs for a {n_rows}-row log")
+            def call():
+                response = client.get(route)
+                if response.status_code != 200: raise RuntimeError(f"{route} returned status {response.status_code}")
+            results[key] = dict(summarize(timed(call, runs)), rows=n_rows, jobs=len(jobs))
+            print(f"  {route} @ {n_rows} rows: {results[key]['median_ms']} ms")
+    os.remove('prediction_log.csv')
+    return results
+
+
+# --- 4 & 5. generate_data.py and train_model.py ---
+def bench_script(script, repeat, timing_label):
+    """Runs `python <script>` and collects the time it reports for `timing_label` (e.g. "Fit time: 1.23 s").
+
+    Interpreter startup, pandas/xgboost imports and CSV I/O are outside that number; the whole-process
+    wall time is kept alongside as process_ms.
+    """
+    reported = []; pattern = re.compile(re.escape(timing_label) + r': ([0-9.]+) s')
+    def run():
+        output = subprocess.run([sys.executable, script], check=True, capture_output=True, text=True).stdout
+        match = pattern.search(output)
+        if not match: raise RuntimeError(f"{script} did not report '{timing_label}'")
+        reported.append(float(match.group(1)))
+    process = timed(run, repeat)
+    return dict(summarize(reported), process_ms=summarize(process)['median_ms'])
+
+
+def flatten_metrics(results):
+    """Picks the numbers worth comparing between runs, tagged with which direction is better."""
+    metrics = {}
+    if 'predict_route' in results: metrics['predict_route.median_ms'] = (results['predict_route']['median_ms'], LOWER_IS_BETTER)
+    if 'metrics_overhead' in results: metrics['metrics_overhead.hook_cost_us'] = (results['metrics_overhead']['hook_cost_us'], LOWER_IS_BETTER)
+    if 'model_predict' in results:
+        metrics['model_predict.single_row.rows_per_sec'] = (results['model_predict']['single_row']['rows_per_sec'], HIGHER_IS_BETTER)
+        metrics['model_predict.batch.rows_per_sec'] = (results['model_predict']['batch']['rows_per_sec'], HIGHER_IS_BETTER)
+    for name, value in results.get('log_routes', {}).items(): metrics[f'log_routes.{name}.median_ms'] = (value['median_ms'], LOWER_IS_BETTER)
+    if 'generate_data' in results: metrics['generate_data.rows_per_sec'] = (results['generate_data']['rows_per_sec'], HIGHER_IS_BETTER)
+    if 'train_model' in results: metrics['train_model.fit_ms'] = (results['train_model']['median_ms'], LOWER_IS_BETTER)
+    return metrics
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns the list of regressions (metrics that got worse by more than `tolerance`)."""
+    current = flatten_metrics(results); previous = flatten_metrics(baseline); regressions = []
+    print("\n--- Comparison with baseline ---")
+    for name, (value, direction) in current.items():
+        if name not in previous: print(f"  {name}: {value} (new, no baseline)"); continue
+        old_value = previous[name][0]
+        if old_value <= 0: continue
+        change = (value - old_value) / old_value
+        worse = change > tolerance if direction == LOWER_IS_BETTER else change < -tolerance
+        marker = "REGRESSION" if worse else "ok"
+        print(f"  {name}: {old_value} -> {value} ({change * 100:+.1f}%) [{marker}]")
+        if worse: regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prediction, log queries and data generation.")
+    parser.add_argument('--quick', action='store_true', help="Small log sizes and skip train_model.py")
+    parser.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')], help="Comma-separated log sizes, e.g. 1000,100000")
+    parser.add_argument('--repeat', type=int, default=20, help="Runs per micro-benchmark")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="Also write the results to the baseline file")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+    sizes = args.sizes or (QUICK_LOG_SIZES if args.quick else DEFAULT_LOG_SIZES)
+    output_path = os.path.abspath(args.output); baseline_path = os.path.abspath(args.baseline)
+
+    workspace = tempfile.mkdtemp(prefix='timber_bench_')
+    for name in WORKSPACE_FILES: shutil.copy(os.path.join(REPO_DIR, name), workspace)
+    original_dir = os.getcwd(); os.chdir(workspace)
+    try:
+        import joblib
+        os.environ['TIMBER_ARCHIVE_INTERVAL'] = '0' # Background rollup synthetic logs ko beech mein na badle
+        import app as app_module
+        app = app_module.app
+        species_list = joblib.load('species_categories.pkl'); client = app.test_client()
+        results = {'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0]}
+
+        print("Benchmarking /predict (Flask test client)...")
+        results['predict_route'] = bench_predict_route(client, species_list[0], max(3, args.repeat // 4))
+        print("Measuring metrics hooks overhead on /predict...")
+        results['metrics_overhead'] = bench_metrics_overhead(app_module, client, species_list[0], max(5, args.repeat // 2))
+        overhead = results['metrics_overhead']
+        print(f"  with hooks {overhead['with_hooks_ms']} ms, without {overhead['without_hooks_ms']} ms (A/B {overhead['ab_difference_pct']:+.2f}%, includes noise)")
+        print(f"  hooks cost {overhead['hook_cost_us']} us per request = {overhead['overhead_pct']:.4f}% of /predict (target < 1%)")
+        print("Benchmarking model.predict...")
+        results['model_predict'] = bench_model_predict(species_list, args.repeat * 5, batch_size=10_000)
+        print(f"Benchmarking log routes for sizes {sizes}...")
+        results['log_routes'] = bench_log_routes(client, species_list, sizes, max(3, args.repeat // 4))
+        print("Benchmarking generate_data.py...")
+        generate = bench_script('generate_data.py', 3, 'Generation time')
+        with open('synthetic_wood_drying_data.csv', 'r', encoding='utf-8') as f: generated_rows = sum(1 for _ in f) - 1
+        results['generate_data'] = dict(generate, rows=generated_rows, rows_per_sec=round(generated_rows / (generate['median_ms'] / 1000), 1))
+        if not args.quick:
+            print("Benchmarking train_model.py...")
+            results['train_model'] = bench_script('train_model.py', 1, 'Fit time')
+    finally:
+        os.chdir(original_dir); shutil.rmtree(workspace, ignore_errors=True)
+
+    with open(output_path, 'w', encoding='utf-8') as f: json.dump(results, f, indent=2)
+    print(f"\nResults saved to '{output_path}'")
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f: json.dump(results, f, indent=2)
+        print(f"Baseline saved to '{baseline_path}'")
+        return 0
+
+    if not os.path.isfile(baseline_path):
+        print(f"No baseline at '{baseline_path}'. Run with --save-baseline to create one.")
+        return 0
+    with open(baseline_path, 'r', encoding='utf-8') as f: baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nFAILED: {len(regressions)} metric(s) regressed by more than {args.tolerance * 100:.0f}%.")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import random
+import time
 
 # --- Component 1: Species Knowledge Base (Indian Woods Focus) ---
 # Approximate specific gravity values based on research
@@ -60,6 +61,7 @@ N_ROWS = 10000 # Keep 10,000 data points
 
 species_list = list(SPECIES_GRAVITY_MAP.keys())
 
+generation_start = time.perf_counter() # benchmark.py yeh timing padhta hai (imports aur CSV write ke bina)
 for i in range(N_ROWS):
     # 1. Select Species and get Specific Gravity
     species = random.choice(species_list)
@@ -101,6 +103,9 @@ for i in range(N_ROWS):
         "Drying_Time_Hours": round(drying_time_hours, 2)
     })
 
+generation_seconds = time.perf_counter() - generation_start
+print(f"Generation time: {generation_seconds:.4f} s ({N_ROWS / generation_seconds:.0f} rows/sec)")
+
 # 5. Save to CSV
 df = pd.DataFrame(data)
 # Ensure Target Moisture column exists before saving (was missing header in app.py fix)
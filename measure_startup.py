@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+# --- Startup & First-Prediction Measurement ---
+# Usage: python measure_startup.py [runs]
+#
+# Dono code paths isi run mein, har measurement ek fresh Python process mein (warna imports cache ho jaate hain):
+#   after  (ab)   : import app -> worker background mein model load -> /ready 200 -> /predict in-process
+#   before (pehle): app.py top par flask + serial + fpdf import karta tha aur turant serve karta tha;
+#                   har /predict ek naya `python predict.py ...` process chalata tha
+#
+#   1. import_app      -> server module load
+#   2. boot_to_ready   -> server start se pehla /predict serve karne layak hone tak (before: import ke baad hi)
+#   3. first_predict   -> ready hone ke baad pehla /predict
+#   4. steady_predict  -> uske baad ke /predict ka median
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PAYLOAD = {'species': None, 'thickness': 5.0, 'initial_mc': 60.0, 'target_mc': 12.0}
+
+
+def child():
+    """Runs inside a fresh interpreter and prints one JSON line of timings."""
+    start = time.perf_counter()
+    import app
+    import_done = time.perf_counter()
+    client = app.app.test_client()
+    while client.get('/ready').status_code != 200:
+        if app.worker.error: raise SystemExit(f"Model failed to load: {app.worker.error}")
+        time.sleep(0.01)
+    ready_done = time.perf_counter()
+    payload = dict(PAYLOAD, species=app.worker.loaded[1][0])
+    result = client.post('/predict', json=payload).get_json()
+    if not result.get('success'): raise SystemExit(f"/predict failed: {result.get('error')}")
+    first_done = time.perf_counter()
+    steady = []
+    for _ in range(20):
+        t = time.perf_counter(); client.post('/predict', json=payload); steady.append(time.perf_counter() - t)
+    print(json.dumps({
+        'import_app': import_done - start, 'boot_to_ready': ready_done - start,
+        'first_predict': first_done - ready_done, 'steady_predict': statistics.median(steady),
+        'worker_timings': app.worker.timings, 'species': payload['species']
+    }))
+
+
+def child_before():
+    """The pre-v3.1 app.py startup: its module-level imports, then one predict.py subprocess per /predict."""
+    start = time.perf_counter()
+    import flask, serial, fpdf # Purane app.py ke top-level imports
+    flask.Flask('app')
+    import_done = time.perf_counter()
+    species = sys.argv[2]; command = [sys.executable, 'predict.py', species, '5', '60', '12', '25', '50']
+    predicts = []
+    for _ in range(4):
+        t = time.perf_counter(); subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True, check=True); predicts.append(time.perf_counter() - t)
+    print(json.dumps({
+        'import_app': import_done - start, 'boot_to_ready': import_done - start,
+        'first_predict': predicts[0], 'steady_predict': statistics.median(predicts[1:])
+    }))
+
+
+def run(command):
+    env = dict(os.environ, TIMBER_ARCHIVE_INTERVAL='0') # Measurement asli prediction_log.csv ko archive na kare
+    start = time.perf_counter(); result = subprocess.run(command, cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stdout
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) >= 2 else 3
+    after = []; before = []
+    for _ in range(runs):
+        _, output = run([sys.executable, os.path.abspath(__file__), '--child'])
+        after.append(json.loads(output.strip().splitlines()[-1]))
+        _, output = run([sys.executable, os.path.abspath(__file__), '--child-before', after[-1]['species']])
+        before.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"--- Startup measurement ({runs} runs, median) ---")
+    print(f"{'':>16} {'before':>10} {'after':>10}")
+    for key in ('import_app', 'boot_to_ready', 'first_predict', 'steady_predict'):
+        print(f"{key:>16} {statistics.median(s[key] for s in before) * 1000:7.1f} ms {statistics.median(s[key] for s in after) * 1000:7.1f} ms")
+    print(f"Worker timings (last run): {after[-1]['worker_timings']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == '--child': child()
+    elif len(sys.argv) >= 3 and sys.argv[1] == '--child-before': child_before()
+    else: main()
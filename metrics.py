@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import bisect
+import threading
+from collections import Counter as StackCounter
+
+# --- Lightweight metrics for app.py ---
+# Prometheus text format bina prometheus_client ke. Har update ek lock + ek bisect hai,
+# isliye har request par overhead kuch microseconds ka rehta hai (/predict khud ~13ms leta hai).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def _format_labels(labels):
+    if not labels: return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name; self.help_text = help_text; self.values = {}; self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock: self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock: items = list(self.values.items())
+        for labels, value in items: lines.append(f'{self.name}{_format_labels(labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name; self.help_text = help_text; self.buckets = buckets; self.values = {}; self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items())); index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None: series = self.values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1; series['sum'] += value; series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock: items = [(labels, dict(series, counts=list(series['counts']))) for labels, series in self.values.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count; le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {series["sum"]}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {series["count"]}')
+        return lines
+
+
+class Timer:
+    """with Timer(histogram, route='/predict'): ... -> observes the elapsed seconds."""
+    def __init__(self, histogram, **labels): self.histogram = histogram; self.labels = labels
+
+    def __enter__(self): self.start = time.perf_counter(); return self
+
+    def __exit__(self, *exc): self.histogram.observe(time.perf_counter() - self.start, **self.labels); return False
+
+
+# --- Metric definitions ---
+REQUEST_LATENCY = Histogram('timber_request_duration_seconds', 'Request latency per route.')
+MODEL_INFERENCE = Histogram('timber_model_inference_seconds', 'Time spent running the drying time model for one /predict call.')
+LOG_READ = Histogram('timber_log_read_seconds', 'Time spent reading and parsing prediction_log.csv per request.')
+LOG_ROWS = Histogram('timber_log_rows_parsed', 'Rows parsed from prediction_log.csv per request.', buckets=ROW_BUCKETS)
+SENSOR_RECONNECTS = Counter('timber_sensor_reconnects_total', 'Serial port failures that sent the sensor thread into its reconnect loop.')
+SENSOR_READINGS = Counter('timber_sensor_readings_total', 'Lines read from the serial sensor, by result (ok, sensor_error, invalid).')
+CACHE_REQUESTS = Counter('timber_cache_requests_total', 'Cache lookups by cache name and result (hit, miss). cache="model": in-memory model reused (hit) or reloaded from a changed drying_model.pkl (miss).')
+
+ALL_METRICS = [REQUEST_LATENCY, MODEL_INFERENCE, LOG_READ, LOG_ROWS, SENSOR_RECONNECTS, SENSOR_READINGS, CACHE_REQUESTS]
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def render_metrics():
+    lines = []
+    for metric in ALL_METRICS: lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Sampling profiler (hot-path investigation) ---
+# Har `interval` second par saare threads ka stack dekhta hai aur collapsed-stack format
+# ("frame;frame;frame count") mein deta hai, jo flamegraph.pl / speedscope seedha padh lete hain.
+profiler_lock = threading.Lock()
+
+
+def sample_stacks(duration, interval=0.005):
+    if not profiler_lock.acquire(blocking=False): return None # Ek time par ek hi profile
+    try:
+        stacks = StackCounter(); own_thread = threading.get_ident(); deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread: continue
+                names = []
+                while frame is not None:
+                    names.append(f'{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})'); frame = frame.f_back
+                stacks[';'.join(reversed(names))] += 1
+            time.sleep(interval)
+        return '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common()) + '\n'
+    finally:
+        profiler_lock.release()
@@ -34,35 +34,20 @@ SPECIES_TIPS = {
 
 
 # --- 1. Load the trained model and categories ---
-try:
-    model = joblib.load("drying_model.pkl")
-    known_species = joblib.load("species_categories.pkl")
-except FileNotFoundError:
-    print("ERROR: Model or category files not found.")
-    print("Please run 'train_model.py' first!")
-    sys.exit(1)
-
-# --- 2. Get inputs from the command line ---
-try:
-    species_input = sys.argv[1]
-    thickness_cm = float(sys.argv[2])
-    initial_mc = float(sys.argv[3])
-    target_mc = float(sys.argv[4])
-    temp_c = float(sys.argv[5])
-    humidity_rh = float(sys.argv[6])
-except IndexError:
-    print("Error: Missing inputs.")
-    print("Usage: python predict.py \"Species Name\" Thickness Initial_MC Target_MC Temp Humidity")
-    sys.exit(1)
-except ValueError:
-    print("Error: Invalid number format for inputs.")
-    sys.exit(1)
-
-# --- 3. Validate and process the inputs ---
-if species_input not in known_species:
-    print(f"Error: Unknown species '{species_input}'.")
-    print("Known species are:", known_species)
-    sys.exit(1)
+# (v3.1) Sab kuch functions mein hai taaki prediction_worker.py model ek baar load karke
+# server ke andar hi predict kar sake. Command line usage pehle jaisa hi hai.
+class PredictionError(Exception):
+    """Invalid input for a prediction; the message is what the user should see."""
+
+
+def load_model(model_file="drying_model.pkl", category_file="species_categories.pkl"):
+    """Returns (model, known_species, model_version)."""
+    model = joblib.load(model_file)
+    known_species = joblib.load(category_file)
+    # --- NAYA (v3.0): Version retrain_model.py ne booster ke andar store kiya hai ---
+    model_version = model.get_booster().attr('model_version') or 'v0'
+    return model, known_species, model_version
+
 
 SPECIES_GRAVITY_MAP = {
     "Pine, Southern": 0.55, "Pine, White": 0.36, "Pine, Ponderosa": 0.43,
@@ -71,127 +56,171 @@ SPECIES_GRAVITY_MAP = {
     "Ash, White": 0.65, "Birch, Yellow": 0.67, "Walnut, Black": 0.59,
     "Teak": 0.66, "Mahogany": 0.59, "Spruce": 0.43
 }
-specific_gravity = SPECIES_GRAVITY_MAP.get(species_input, 0.5)
-
-
-# --- 4. Create the input DataFrame for the model ---
-input_data_dict = {
-    "Species": species_input,
-    "Thickness_cm": thickness_cm,
-    "Specific_Gravity": specific_gravity,
-    "Initial_Moisture": initial_mc,
-    "Target_Moisture": target_mc,
-    "Temperature_C": temp_c,
-    "Humidity_RH": humidity_rh
-}
 
-def create_input_df(data_dict):
-    df = pd.DataFrame([data_dict])
-    df['Species'] = pd.Categorical(df['Species'], categories=known_species)
-    training_features = [
-        "Species", "Thickness_cm", "Specific_Gravity",
-        "Initial_Moisture", "Target_Moisture", "Temperature_C", "Humidity_RH"
-    ]
-    return df[training_features]
-
-baseline_input_df = create_input_df(input_data_dict)
-
-# --- 5. Make the BASELINE prediction ---
-try:
-    baseline_time = model.predict(baseline_input_df)[0]
-    baseline_time = max(0.1, float(baseline_time)) # Ensure it's a standard float
-except Exception as e:
-     print(f"Error during prediction: {e}")
-     baseline_time = 0
-
-# --- 6. Show the Baseline Result ---
-print(f"\n--- Prediction Result ---")
-print(f"Input Species: {species_input}")
-print(f"Input Thickness: {thickness_cm} cm")
-print(f"Conditions: {temp_c}°C, {humidity_rh}% Humidity")
-print(f"Moisture Range: {initial_mc}% -> {target_mc}%")
-print("---------------------------------")
-if baseline_time > 0:
-    print(f"PREDICTED DRYING TIME: {baseline_time:.2f} hours")
-    print(f"(Approximately {baseline_time/24:.1f} days)")
-else:
-    print("Could not calculate prediction.")
-
-
-# --- 7. Dynamic "What-If" Recommendations ---
-if baseline_time > 0:
-    print("\n--- Smart Recommendations (What-If Analysis) ---")
-    recommendations = []
-    try:
-        # Scenario 1: Increase temp
-        if temp_c < 55:
-            temp_up_dict = input_data_dict.copy()
-            temp_up_dict['Temperature_C'] = temp_c + 5
-            new_time_temp = max(0.1, float(model.predict(create_input_df(temp_up_dict))[0]))
-            temp_savings = baseline_time - new_time_temp
-            if temp_savings > 1:
-                recommendations.append(
-                    (temp_savings, f"[TIP] Increasing temp by 5°C could save approx. {temp_savings:.1f} hours.")
-                )
-
-        # Scenario 2: Decrease humidity
-        if humidity_rh > 30:
-            hum_down_dict = input_data_dict.copy()
-            hum_down_dict['Humidity_RH'] = humidity_rh - 10
-            new_time_hum = max(0.1, float(model.predict(create_input_df(hum_down_dict))[0]))
-            hum_savings = baseline_time - new_time_hum
-            if hum_savings > 1:
-                recommendations.append(
-                    (hum_savings, f"[TIP] Decreasing humidity by 10% could save approx. {hum_savings:.1f} hours.")
-                )
-
-        recommendations.sort(key=lambda x: x[0], reverse=True)
-
-        if not recommendations:
-            print("[OK] Conditions are near optimal, or changes have minimal effect.")
-        else:
-            for saving, rec in recommendations:
-                print(rec)
+TRAINING_FEATURES = [
+    "Species", "Thickness_cm", "Specific_Gravity",
+    "Initial_Moisture", "Target_Moisture", "Temperature_C", "Humidity_RH"
+]
 
-    except Exception as e:
-        print(f"Could not calculate recommendations: {e}")
 
-    # Add thickness info
-    if thickness_cm > 5:
-        print("[INFO] This is a thick board; drying will always take significant time.")
+def create_input_df(data_dict, known_species):
+    df = pd.DataFrame([data_dict])
+    df['Species'] = pd.Categorical(df['Species'], categories=known_species)
+    return df[TRAINING_FEATURES]
 
-    # --- Print Species Specific Tip ---
-    print("\n--- Species Specific Advice ---")
-    tip = SPECIES_TIPS.get(species_input, SPECIES_TIPS["Default"])
-    print(tip)
-    # --- NAYA: Add Disclaimer ---
-    print("\n[Disclaimer] These tips are general guidelines. Actual results depend on specific kiln conditions, wood quality, and operator expertise.")
-    # --- Disclaimer END ---
 
+def predict_drying(model, known_species, model_version, species_input, thickness_cm, initial_mc, target_mc, temp_c, humidity_rh):
+    """Runs the full prediction and returns the same text the command line version prints."""
+    out = []
 
-    # --- Generate and Print Graph Data ---
-    print("\n--- Predicted Drying Curve Data ---")
-    try:
-        if baseline_time <= 0:
-             raise ValueError("Baseline time must be positive to generate graph.")
+    # --- 3. Validate and process the inputs ---
+    if species_input not in known_species:
+        raise PredictionError(f"Error: Unknown species '{species_input}'.\nKnown species are: {known_species}")
 
-        time_points = np.linspace(0, baseline_time, num=10)
-        time_ratio = time_points / baseline_time if baseline_time > 0 else np.zeros_like(time_points)
-        moisture_points = initial_mc - (initial_mc - target_mc) * np.sqrt(np.maximum(0, time_ratio))
-        moisture_points[0] = initial_mc
-        moisture_points[-1] = target_mc
+    specific_gravity = SPECIES_GRAVITY_MAP.get(species_input, 0.5)
 
-        # Convert NumPy floats to standard Python floats using float()
-        graph_data = {
-            "time_labels": [round(float(t), 1) for t in time_points],
-            "moisture_values": [round(float(m), 1) for m in moisture_points]
-        }
+    # --- 4. Create the input DataFrame for the model ---
+    input_data_dict = {
+        "Species": species_input,
+        "Thickness_cm": thickness_cm,
+        "Specific_Gravity": specific_gravity,
+        "Initial_Moisture": initial_mc,
+        "Target_Moisture": target_mc,
+        "Temperature_C": temp_c,
+        "Humidity_RH": humidity_rh
+    }
 
-        print("GRAPH_DATA_START")
-        print(json.dumps(graph_data)) # Ab yeh fail nahi hoga
-        print("GRAPH_DATA_END")
+    baseline_input_df = create_input_df(input_data_dict, known_species)
 
+    # --- 5. Make the BASELINE prediction ---
+    try:
+        baseline_time = model.predict(baseline_input_df)[0]
+        baseline_time = max(0.1, float(baseline_time)) # Ensure it's a standard float
     except Exception as e:
-        print(f"Could not generate graph data: {e}")
-    # --- Graph Data END ---
+         out.append(f"Error during prediction: {e}")
+         baseline_time = 0
+
+    # --- 6. Show the Baseline Result ---
+    out.append(f"\n--- Prediction Result ---")
+    out.append(f"Input Species: {species_input}")
+    out.append(f"Input Thickness: {thickness_cm} cm")
+    out.append(f"Conditions: {temp_c}°C, {humidity_rh}% Humidity")
+    out.append(f"Moisture Range: {initial_mc}% -> {target_mc}%")
+    out.append(f"Model Version: {model_version}")
+    out.append("---------------------------------")
+    if baseline_time > 0:
+        out.append(f"PREDICTED DRYING TIME: {baseline_time:.2f} hours")
+        out.append(f"(Approximately {baseline_time/24:.1f} days)")
+    else:
+        out.append("Could not calculate prediction.")
+
+
+    # --- 7. Dynamic "What-If" Recommendations ---
+    if baseline_time > 0:
+        out.append("\n--- Smart Recommendations (What-If Analysis) ---")
+        recommendations = []
+        try:
+            # Scenario 1: Increase temp
+            if temp_c < 55:
+                temp_up_dict = input_data_dict.copy()
+                temp_up_dict['Temperature_C'] = temp_c + 5
+                new_time_temp = max(0.1, float(model.predict(create_input_df(temp_up_dict, known_species))[0]))
+                temp_savings = baseline_time - new_time_temp
+                if temp_savings > 1:
+                    recommendations.append(
+                        (temp_savings, f"[TIP] Increasing temp by 5°C could save approx. {temp_savings:.1f} hours.")
+                    )
+
+            # Scenario 2: Decrease humidity
+            if humidity_rh > 30:
+                hum_down_dict = input_data_dict.copy()
+                hum_down_dict['Humidity_RH'] = humidity_rh - 10
+                new_time_hum = max(0.1, float(model.predict(create_input_df(hum_down_dict, known_species))[0]))
+                hum_savings = baseline_time - new_time_hum
+                if hum_savings > 1:
+                    recommendations.append(
+                        (hum_savings, f"[TIP] Decreasing humidity by 10% could save approx. {hum_savings:.1f} hours.")
+                    )
+
+            recommendations.sort(key=lambda x: x[0], reverse=True)
+
+            if not recommendations:
+                out.append("[OK] Conditions are near optimal, or changes have minimal effect.")
+            else:
+                for saving, rec in recommendations:
+                    out.append(rec)
+
+        except Exception as e:
+            out.append(f"Could not calculate recommendations: {e}")
+
+        # Add thickness info
+        if thickness_cm > 5:
+            out.append("[INFO] This is a thick board; drying will always take significant time.")
+
+        # --- Print Species Specific Tip ---
+        out.append("\n--- Species Specific Advice ---")
+        tip = SPECIES_TIPS.get(species_input, SPECIES_TIPS["Default"])
+        out.append(tip)
+        # --- NAYA: Add Disclaimer ---
+        out.append("\n[Disclaimer] These tips are general guidelines. Actual results depend on specific kiln conditions, wood quality, and operator expertise.")
+        # --- Disclaimer END ---
+
+
+        # --- Generate and Print Graph Data ---
+        out.append("\n--- Predicted Drying Curve Data ---")
+        try:
+            if baseline_time <= 0:
+                 raise ValueError("Baseline time must be positive to generate graph.")
+
+            time_points = np.linspace(0, baseline_time, num=10)
+            time_ratio = time_points / baseline_time if baseline_time > 0 else np.zeros_like(time_points)
+            moisture_points = initial_mc - (initial_mc - target_mc) * np.sqrt(np.maximum(0, time_ratio))
+            moisture_points[0] = initial_mc
+            moisture_points[-1] = target_mc
+
+            # Convert NumPy floats to standard Python floats using float()
+            graph_data = {
+                "time_labels": [round(float(t), 1) for t in time_points],
+                "moisture_values": [round(float(m), 1) for m in moisture_points]
+            }
+
+            out.append("GRAPH_DATA_START")
+            out.append(json.dumps(graph_data)) # Ab yeh fail nahi hoga
+            out.append("GRAPH_DATA_END")
+
+        except Exception as e:
+            out.append(f"Could not generate graph data: {e}")
+        # --- Graph Data END ---
+
+    return "\n".join(out) + "\n"
+
+
+if __name__ == "__main__":
+    try:
+        model, known_species, model_version = load_model()
+    except FileNotFoundError:
+        print("ERROR: Model or category files not found.")
+        print("Please run 'train_model.py' first!")
+        sys.exit(1)
+
+    # --- 2. Get inputs from the command line ---
+    try:
+        species_input = sys.argv[1]
+        thickness_cm = float(sys.argv[2])
+        initial_mc = float(sys.argv[3])
+        target_mc = float(sys.argv[4])
+        temp_c = float(sys.argv[5])
+        humidity_rh = float(sys.argv[6])
+    except IndexError:
+        print("Error: Missing inputs.")
+        print("Usage: python predict.py \"Species Name\" Thickness Initial_MC Target_MC Temp Humidity")
+        sys.exit(1)
+    except ValueError:
+        print("Error: Invalid number format for inputs.")
+        sys.exit(1)
 
+    try:
+        print(predict_drying(model, known_species, model_version, species_input, thickness_cm, initial_mc, target_mc, temp_c, humidity_rh), end="")
+    except PredictionError as e:
+        print(e)
+        sys.exit(1)
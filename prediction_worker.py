@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+import metrics
+
+# --- Prewarmed Prediction Worker (v3.1) ---
+# Pehle har /predict ek naya `python predict.py` process chalata tha, jo har baar pandas + xgboost
+# import aur model unpickle karta tha (~2 second). Ab ek background thread server start hote hi
+# yeh sab ek baar karta hai, ek dummy predict se model ko warm karta hai, aur phir /predict
+# seedha memory mein rakhe model se chalta hai. /ready tab tak 503 deta hai.
+#
+# Hot-swap: retrain_model.py naya model os.replace() se likhta hai. Har predict par file ka
+# (mtime, size, inode) check hota hai; badla ho toh naya model load + warm karke reference swap
+# kar dete hain. Jo requests purana model pakad ke chal rahi hain woh usi se poori hoti hain.
+
+MODEL_FILE = 'drying_model.pkl'
+CATEGORY_FILE = 'species_categories.pkl'
+READY_TIMEOUT_SECONDS = 60
+
+
+class PredictionWorker:
+    def __init__(self, model_file=MODEL_FILE, category_file=CATEGORY_FILE):
+        self.model_file = model_file; self.category_file = category_file
+        self.ready = threading.Event(); self.start_lock = threading.Lock(); self.reload_lock = threading.Lock()
+        self.thread = None; self.error = None; self.predict_module = None
+        self.loaded = None # (model, known_species, model_version, file_signature) - ek hi reference, atomically swap hota hai
+        self.timings = {}
+
+    def start(self):
+        """Starts loading in the background (safe to call more than once)."""
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._warm_up, name='prediction-warmup', daemon=True); self.thread.start()
+        return self
+
+    def _file_signature(self):
+        stat = os.stat(self.model_file)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _load(self):
+        signature = self._file_signature()
+        start = time.perf_counter()
+        model, known_species, model_version = self.predict_module.load_model(self.model_file, self.category_file)
+        self.timings['model_load_seconds'] = round(time.perf_counter() - start, 3)
+        start = time.perf_counter()
+        # Dummy predict: xgboost pehli call par apne internal buffers banata hai, woh cost yahin de do
+        self.predict_module.predict_drying(model, known_species, model_version, known_species[0], 5.0, 60.0, 12.0, 30.0, 60.0)
+        self.timings['warmup_seconds'] = round(time.perf_counter() - start, 3)
+        return (model, known_species, model_version, signature)
+
+    def _warm_up(self):
+        try:
+            start = time.perf_counter()
+            import predict as predict_module # pandas, numpy, joblib, xgboost sab yahin load hote hain
+            self.predict_module = predict_module
+            self.timings['import_seconds'] = round(time.perf_counter() - start, 3)
+            self.loaded = self._load()
+            print(f"(Prediction Worker) Ready with model {self.loaded[2]} (import {self.timings['import_seconds']}s, load {self.timings['model_load_seconds']}s, warm-up {self.timings['warmup_seconds']}s)")
+        except Exception as e:
+            self.error = e; print(f"(Prediction Worker) Failed to load model: {e}")
+        finally:
+            self.ready.set()
+
+    def _current(self):
+        """The loaded model tuple, reloading first if drying_model.pkl was replaced on disk."""
+        loaded = self.loaded
+        try: signature = self._file_signature()
+        except OSError: return loaded # File abhi replace ho rahi hai; purana model use karo
+        if signature == loaded[3]: metrics.record_cache('model', hit=True); return loaded # In-memory model abhi bhi file jaisa hai
+        with self.reload_lock:
+            if self.loaded[3] != signature:
+                metrics.record_cache('model', hit=False)
+                old_version = self.loaded[2]
+                try:
+                    self.loaded = self._load()
+                    print(f"(Prediction Worker) Model file changed, swapped {old_version} -> {self.loaded[2]}")
+                except Exception as e:
+                    # Nayi file load nahi hui: purana model chalne do, aur isi file ke liye dobara try mat karo
+                    self.loaded = self.loaded[:3] + (signature,)
+                    print(f"(Prediction Worker) Could not load new model file, keeping {old_version}: {e}")
+        return self.loaded
+
+    def status(self):
+        state = {'ready': self.ready.is_set() and self.error is None, 'timings': dict(self.timings)}
+        if self.loaded: state['model_version'] = self.loaded[2]
+        if self.error: state['error'] = str(self.error)
+        return state
+
+    def predict(self, species, thickness, initial_mc, target_mc, temp_c, humidity_rh):
+        """Returns (prediction text, model version). Raises predict.PredictionError for bad input, RuntimeError if the model could not load."""
+        self.start()
+        if not self.ready.wait(READY_TIMEOUT_SECONDS): raise RuntimeError("Prediction model is still loading, please try again.")
+        if self.error: raise RuntimeError(f"Prediction model could not be loaded: {self.error}")
+        model, known_species, model_version, _ = self._current()
+        return self.predict_module.predict_drying(model, known_species, model_version, species, float(thickness), float(initial_mc), float(target_mc), float(temp_c), float(humidity_rh)), model_version
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from urllib.parse import quote
+
+# --- Replay / Load Harness ---
+# Recorded traffic (JSONL) ko app.py par dobara chalata hai, bilkul offline:
+#   - app.py isi process mein ek local werkzeug server par chalta hai (temp folder mein, asli logs safe)
+#   - serial sensor ki jagah ek pty "fake device" wahi JSON lines bhejta hai jo read_sensor_data_loop padhta hai
+#   - asyncio clients log ke timestamps ke hisaab se requests bhejte hain
+#
+# Request log format, ek line = ek request:
+#   {"t": 0.0, "method": "GET", "path": "/get_sensors"}
+#   {"t": 1.5, "method": "POST", "path": "/predict", "body": {"species": "Sal", "thickness": 5, "initial_mc": 60, "target_mc": 12}}
+# "t" recording shuru hone se seconds hain.
+#
+# Usage:
+#   python replay.py traffic.jsonl                      -> real-time replay
+#   python replay.py traffic.jsonl --speed 10           -> 10x fast
+#   python replay.py traffic.jsonl --speed 0 -c 16      -> jitna fast ho sake, 16 concurrent requests
+#   python replay.py --synthesize traffic.jsonl --duration 300   -> dashboard jaisa sample log banao
+#   python replay.py traffic.jsonl --url http://127.0.0.1:5000   -> already chal rahe server par (fake sensor nahi)
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKSPACE_FILES = ['drying_model.pkl', 'species_categories.pkl']
+
+
+# --- Request log ---
+def load_requests(path):
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line: continue
+            try:
+                entry = json.loads(line)
+                requests.append({'t': float(entry.get('t', 0.0)), 'method': entry.get('method', 'GET').upper(), 'path': entry['path'], 'body': entry.get('body')})
+            except (json.JSONDecodeError, KeyError, ValueError, TypeError) as e: print(f"Skipping malformed request on line {line_number}: {e}")
+    requests.sort(key=lambda r: r['t'])
+    return requests
+
+
+def synthesize_requests(path, duration, species):
+    """Writes a log shaped like the real UI: sensor poll every 3s, dashboard poll every 5s/60s, a predict + save now and then."""
+    rng = random.Random(42); entries = []
+    for t in range(0, int(duration), 3): entries.append({'t': float(t), 'method': 'GET', 'path': '/get_sensors'})
+    for t in range(0, int(duration), 5): entries.append({'t': t + 0.5, 'method': 'GET', 'path': '/get_active_jobs'})
+    for t in range(0, int(duration), 60): entries.append({'t': t + 0.7, 'method': 'GET', 'path': '/get_history'})
+    t = rng.uniform(1, 20)
+    while t < duration:
+        body = {'species': rng.choice(species), 'thickness': round(rng.uniform(1.5, 12.0), 1), 'initial_mc': round(rng.uniform(35.0, 120.0), 1), 'target_mc': round(rng.uniform(8.0, 15.0), 1)}
+        entries.append({'t': round(t, 3), 'method': 'POST', 'path': '/predict', 'body': body})
+        entries.append({'t': round(t + 4, 3), 'method': 'POST', 'path': '/log_prediction', 'body': dict(body, temp_c=30.0, humidity_rh=60.0, predicted_hours=round(rng.uniform(10, 400), 2))})
+        t += rng.uniform(10, 40)
+    entries.sort(key=lambda e: e['t'])
+    with open(path, 'w', encoding='utf-8') as f:
+        for entry in entries: f.write(json.dumps(entry) + '\n')
+    print(f"Wrote {len(entries)} requests ({duration:.0f}s of traffic) to '{path}'")
+
+
+# --- Fake serial device ---
+class FakeSensorDevice:
+    """A pty pair: the app opens the slave side as its serial port, we write sensor JSON lines to the master side."""
+
+    def __init__(self, interval=2.0, seed=7):
+        import pty # Sirf Linux/macOS; Windows par pty nahi hota
+        self.master_fd, self.slave_fd = pty.openpty(); self.port = os.ttyname(self.slave_fd)
+        self.interval = interval; self.rng = random.Random(seed); self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='fake-sensor', daemon=True)
+        self.lines_sent = 0; self.temp = 32.0; self.humidity = 65.0
+
+    def start(self): self.thread.start(); return self
+
+    def _next_line(self):
+        roll = self.rng.random()
+        if roll < 0.02: return '{"error": "Failed to read from DHT sensor!"}' # Firmware ka error message
+        if roll < 0.04: return 'garbage\x00line' # Loose cable jaisa kachra
+        self.temp = min(60.0, max(20.0, self.temp + self.rng.uniform(-0.3, 0.3)))
+        self.humidity = min(95.0, max(20.0, self.humidity + self.rng.uniform(-0.8, 0.8)))
+        return json.dumps({'temp': round(self.temp, 2), 'humidity': round(self.humidity, 2)})
+
+    def _run(self):
+        while not self.stop.is_set():
+            try: os.write(self.master_fd, (self._next_line() + '\r\n').encode('utf-8')); self.lines_sent += 1
+            except OSError: break
+            self.stop.wait(self.interval)
+
+    def close(self):
+        self.stop.set(); self.thread.join(timeout=2)
+        for fd in (self.master_fd, self.slave_fd):
+            try: os.close(fd)
+            except OSError: pass
+
+
+# --- HTTP client (asyncio streams, koi extra dependency nahi) ---
+async def send_request(host, port, method, path, body, timeout):
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    head = f"{method} {quote(path, safe='/?=&%:')} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\nContent-Length: {len(data)}\r\n"
+    if body is not None: head += "Content-Type: application/json\r\n"
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(head.encode('ascii') + b"\r\n" + data); await writer.drain()
+        # Content-Length tak hi padho; EOF ka wait karne se har request mein server ke socket close ka delay judta hai
+        header = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        status = int(header.split(b' ', 2)[1]); length = None
+        for line in header.split(b'\r\n')[1:]:
+            if line.lower().startswith(b'content-length:'): length = int(line.split(b':', 1)[1])
+        payload = await asyncio.wait_for(reader.readexactly(length) if length is not None else reader.read(), timeout)
+    finally:
+        writer.close()
+        try: await writer.wait_closed()
+        except OSError: pass
+    return status, payload
+
+
+def is_app_error(status, payload):
+    """Non-2xx, or a JSON body with success: false (the app reports most failures that way with HTTP 200)."""
+    if status >= 400: return True
+    try: result = json.loads(payload)
+    except (ValueError, UnicodeDecodeError): return False
+    return isinstance(result, dict) and result.get('success') is False
+
+
+async def replay(requests, host, port, speed, concurrency, timeout, route_of):
+    semaphore = asyncio.Semaphore(concurrency); results = []; loop = asyncio.get_running_loop(); start = loop.time()
+
+    async def run_one(entry):
+        if speed > 0:
+            delay = start + entry['t'] / speed - loop.time()
+            if delay > 0: await asyncio.sleep(delay)
+        async with semaphore:
+            lag = max(0.0, loop.time() - start - (entry['t'] / speed if speed > 0 else 0.0))
+            sent = time.perf_counter()
+            try:
+                status, payload = await send_request(host, port, entry['method'], entry['path'], entry['body'], timeout)
+                error = is_app_error(status, payload)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, IndexError) as e:
+                status, error = f'{type(e).__name__}', True
+            results.append({'route': route_of(entry['method'], entry['path']), 'latency': time.perf_counter() - sent, 'status': status, 'error': error, 'lag': lag})
+
+    await asyncio.gather(*(run_one(entry) for entry in requests))
+    return results, loop.time() - start
+
+
+# --- Report ---
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def build_report(results, wall_seconds):
+    by_route = {}
+    for result in results: by_route.setdefault(result['route'], []).append(result)
+    report = {'wall_seconds': round(wall_seconds, 3), 'requests': len(results), 'errors': sum(r['error'] for r in results), 'routes': {}}
+    for route, items in sorted(by_route.items()):
+        latencies = sorted(r['latency'] * 1000 for r in items); statuses = {}
+        for r in items: statuses[str(r['status'])] = statuses.get(str(r['status']), 0) + 1
+        report['routes'][route] = {
+            'count': len(items), 'error_rate': round(sum(r['error'] for r in items) / len(items), 4),
+            'p50_ms': round(percentile(latencies, 0.50), 2), 'p90_ms': round(percentile(latencies, 0.90), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2), 'max_ms': round(latencies[-1], 2),
+            'max_schedule_lag_ms': round(max(r['lag'] for r in items) * 1000, 2), 'statuses': statuses
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n--- Replay Report ({report['requests']} requests in {report['wall_seconds']}s, {report['errors']} errors) ---")
+    width = max([len('route')] + [len(route) for route in report['routes']]) + 2
+    print(f"{'route':<{width}}{'count':>7}{'err%':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for route, stats in report['routes'].items():
+        print(f"{route:<{width}}{stats['count']:>7}{stats['error_rate'] * 100:>6.1f}%{stats['p50_ms']:>9.1f}ms{stats['p90_ms']:>8.1f}ms{stats['p99_ms']:>8.1f}ms{stats['max_ms']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a JSONL request log against app.py.")
+    parser.add_argument('log', help="JSONL request log (or output path with --synthesize)")
+    parser.add_argument('--speed', type=float, default=1.0, help="1 = real time, 10 = 10x faster, 0 = no delays")
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help="Max requests in flight")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument('--url', help="Replay against an already running server instead of an in-process one")
+    parser.add_argument('--sensor-interval', type=float, default=2.0, help="Seconds between fake sensor lines (scaled by --speed)")
+    parser.add_argument('--output', help="Also write the report as JSON to this path")
+    parser.add_argument('--synthesize', action='store_true', help="Write a sample request log to LOG and exit")
+    parser.add_argument('--duration', type=float, default=300.0, help="Seconds of traffic for --synthesize")
+    args = parser.parse_args()
+
+    if args.synthesize:
+        import joblib
+        synthesize_requests(args.log, args.duration, joblib.load(os.path.join(REPO_DIR, 'species_categories.pkl')))
+        return 0
+
+    requests = load_requests(args.log)
+    if not requests: print(f"No requests found in '{args.log}'."); return 1
+    log_path = os.path.abspath(args.log)
+    output_path = os.path.abspath(args.output) if args.output else None
+
+    if args.url:
+        from urllib.parse import urlparse
+        target = urlparse(args.url); host, port = target.hostname, target.port or 80
+        route_of = lambda method, path: f"{method} /{path.lstrip('/').split('/', 1)[0]}"
+        print(f"Replaying {len(requests)} requests from '{log_path}' against {args.url}...")
+        results, wall = asyncio.run(replay(requests, host, port, args.speed, args.concurrency, args.timeout, route_of))
+    else:
+        workspace = tempfile.mkdtemp(prefix='timber_replay_')
+        for name in WORKSPACE_FILES: shutil.copy(os.path.join(REPO_DIR, name), workspace)
+        original_dir = os.getcwd(); os.chdir(workspace); sys.path.insert(0, REPO_DIR)
+        device = None; server = None
+        try:
+            import app
+            import logging
+            from werkzeug.serving import make_server
+            logging.getLogger('werkzeug').setLevel(logging.ERROR) # Har request ki access log line report ko dhak deti hai
+            from werkzeug.exceptions import HTTPException
+            url_adapter = app.app.url_map.bind('localhost')
+
+            def route_of(method, path):
+                try: rule, _ = url_adapter.match(path.split('?', 1)[0], method=method, return_rule=True); return f"{method} {rule.rule}"
+                except HTTPException: return f"{method} unmatched"
+
+            # Fake sensor + server, jaise production mein `python app.py` karta
+            device = FakeSensorDevice(interval=args.sensor_interval / args.speed if args.speed > 0 else 0.05).start()
+            app.SERIAL_PORT = device.port
+            app.sensor_thread = threading.Thread(target=app.read_sensor_data_loop, daemon=True); app.sensor_thread.start()
+            server = make_server('127.0.0.1', 0, app.app, threaded=True)
+            threading.Thread(target=server.serve_forever, name='replay-server', daemon=True).start()
+            host, port = '127.0.0.1', server.server_port
+            if not app.worker.ready.wait(120) or app.worker.error: print(f"Prediction model did not load: {app.worker.error}"); return 1
+            print(f"Server on {host}:{port}, fake sensor on {device.port}. Replaying {len(requests)} requests from '{log_path}' at {'max' if args.speed <= 0 else f'{args.speed:g}x'} speed...")
+            results, wall = asyncio.run(replay(requests, host, port, args.speed, args.concurrency, args.timeout, route_of))
+            print(f"Fake sensor sent {device.lines_sent} lines; last reading seen by app: {app.latest_sensor_data}")
+        finally:
+            if server is not None: server.shutdown()
+            if 'app' in sys.modules:
+                sys.modules['app'].stop_sensor_thread.set()
+                if sys.modules['app'].sensor_thread: sys.modules['app'].sensor_thread.join(timeout=5)
+            if device is not None: device.close()
+            os.chdir(original_dir); shutil.rmtree(workspace, ignore_errors=True)
+
+    report = build_report(results, wall); print_report(report)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f: json.dump(report, f, indent=2)
+        print(f"Report saved to '{output_path}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+import os
+import sys
+import io
+import csv
+import json
+import time
+import zlib
+import tempfile
+from datetime import datetime, timedelta
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import archive
+from predict import SPECIES_GRAVITY_MAP # Wahi features jo serving mein use hote hain
+
+# --- Online Model Refresh (v3.0) ---
+# Completed jobs from prediction_log.csv and the columnar archive (joined with actual readings from
+# actual_readings.csv) are fed back into the live model using XGBoost training
+# continuation. The new booster is only swapped in if it beats the old one on a
+# holdout, and the swap is a single os.replace() so a running predictor always
+# sees either the complete old file or the complete new file.
+#
+# Holdout har job ke Timestamp ke hash se fixed hai, isliye koi holdout job kabhi training mein nahi jaati,
+# chahe jobs kitni bhi badh jayein. Jin jobs par booster train ho chuka hai unke Timestamps booster ke
+# 'trained_jobs' attribute mein rehte hain (model file ke saath hi atomically save), aur sirf baaki jobs par
+# training hoti hai. Start time ka watermark nahi: actual reading job khatam hone par aati hai, kisi bhi order mein.
+
+LOG_FILE = 'prediction_log.csv'
+ACTUALS_FILE = 'actual_readings.csv'
+MODEL_FILE = 'drying_model.pkl'
+CATEGORY_FILE = 'species_categories.pkl'
+
+EXTRA_ROUNDS = 50        # Kitne naye trees add karne hain har refresh mein
+MIN_JOBS = 20            # Isse kam nayi training jobs par retrain nahi karenge
+HOLDOUT_BUCKETS = 5      # Har 5 mein se 1 job (hash ke hisaab se) hamesha holdout
+
+FEATURES = [
+    "Species", "Thickness_cm", "Specific_Gravity",
+    "Initial_Moisture", "Target_Moisture", "Temperature_C", "Humidity_RH"
+]
+
+
+
+def get_model_version(model):
+    """Returns the version stored inside the booster ('v0' for the original train_model.py output)."""
+    try: return model.get_booster().attr('model_version') or 'v0'
+    except Exception: return 'v0'
+
+
+def get_trained_jobs(model):
+    """Timestamps of the jobs already trained into the booster (empty for the train_model.py output)."""
+    try: return set(json.loads(model.get_booster().attr('trained_jobs') or '[]'))
+    except Exception: return set()
+
+
+def is_holdout(timestamp):
+    """Fixed split: crc32 of the job Timestamp, so a job stays on the same side across refreshes."""
+    return zlib.crc32(timestamp.encode('utf-8')) % HOLDOUT_BUCKETS == 0
+
+
+def load_actual_readings(actuals_file=ACTUALS_FILE):
+    """Timestamp -> {'hours': float, 'final_mc': float or None} for every job with a recorded actual."""
+    actuals = {}
+    if not os.path.isfile(actuals_file): return actuals
+    with open(actuals_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            try:
+                hours = float(row['Actual_Hours'])
+                if hours <= 0: continue
+                try: final_mc = float(row.get('Final_Moisture') or '')
+                except (ValueError, TypeError): final_mc = None
+                actuals[row['Timestamp'].strip()] = {'hours': hours, 'final_mc': final_mc}
+            except (ValueError, KeyError, TypeError) as e: print(f"Skipping malformed actual reading: {row} | Error: {e}"); continue
+    return actuals
+
+
+ARCHIVE_COLUMNS = ['Timestamp', 'Species', 'Thickness_cm', 'Initial_Moisture', 'Target_Moisture', 'Temperature_C', 'Humidity_RH']
+
+
+def collect_archived_jobs(known_species, actuals, columns, archive_dir=archive.ARCHIVE_DIR):
+    """Archived jobs with an actual reading. `columns` holds only the feature columns, straight from the .npy files."""
+    if len(columns['Timestamp']) == 0 or not actuals: return pd.DataFrame(columns=['Timestamp'] + FEATURES + ['Drying_Time_Hours'])
+    timestamps = np.char.replace(np.datetime_as_string(columns['Timestamp'].astype('datetime64[s]')), 'T', ' ')
+    species = np.array(archive.load_dictionary('species', archive_dir), dtype=object)[columns['Species']]
+    mask = np.isin(timestamps, list(actuals)) & np.isin(species, list(known_species))
+    timestamps = timestamps[mask]; species = species[mask]
+    final_mc = np.array([actuals[ts]['final_mc'] if actuals[ts]['final_mc'] is not None else np.nan for ts in timestamps], dtype=np.float64)
+    df = pd.DataFrame({
+        "Timestamp": timestamps.astype(object),
+        "Species": species,
+        "Thickness_cm": columns['Thickness_cm'][mask],
+        "Specific_Gravity": [SPECIES_GRAVITY_MAP.get(name, 0.5) for name in species],
+        "Initial_Moisture": columns['Initial_Moisture'][mask],
+        "Target_Moisture": np.where(np.isnan(final_mc), columns['Target_Moisture'][mask], final_mc),
+        "Temperature_C": columns['Temperature_C'][mask],
+        "Humidity_RH": columns['Humidity_RH'][mask],
+        "Drying_Time_Hours": [actuals[ts]['hours'] for ts in timestamps]
+    })
+    return df.dropna()
+
+
+def collect_completed_jobs(known_species, log_file=LOG_FILE, actuals_file=ACTUALS_FILE, now=None, archive_dir=archive.ARCHIVE_DIR):
+    """Builds the training frame from completed jobs (CSV + archive) that have an actual drying time recorded."""
+    now = now or datetime.now(); actuals = load_actual_readings(actuals_file); rows = []
+    # CSV aur archive ek hi lock ke andar padhte hain, taaki beech mein rollup se koi job do baar na aaye
+    text, archived_columns = archive.log_snapshot(log_file, ARCHIVE_COLUMNS, archive_dir)
+    archived = collect_archived_jobs(known_species, actuals, archived_columns, archive_dir)
+    if text:
+        with io.StringIO(text) as f:
+            for row in csv.DictReader(f, skipinitialspace=True):
+                try:
+                    timestamp = row['Timestamp'].strip(); species = row.get('Species')
+                    if species not in known_species or timestamp not in actuals: continue
+                    start_time = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+                    if start_time + timedelta(hours=float(row['Predicted_Hours'])) > now: continue # Still drying
+                    actual = actuals[timestamp]
+                    # Agar actual final moisture mila hai toh wahi use karo, warna target maan lo
+                    final_mc = actual['final_mc'] if actual['final_mc'] is not None else float(row['Target_Moisture'])
+                    rows.append({
+                        "Timestamp": timestamp,
+                        "Species": species,
+                        "Thickness_cm": float(row['Thickness_cm']),
+                        "Specific_Gravity": SPECIES_GRAVITY_MAP.get(species, 0.5),
+                        "Initial_Moisture": float(row['Initial_Moisture']),
+                        "Target_Moisture": final_mc,
+                        "Temperature_C": float(row['Temperature_C']),
+                        "Humidity_RH": float(row['Humidity_RH']),
+                        "Drying_Time_Hours": actual['hours']
+                    })
+                except (ValueError, KeyError, TypeError, AttributeError) as e: print(f"Skipping malformed row for retraining: {row} | Error: {e}"); continue
+    df = pd.DataFrame(rows, columns=['Timestamp'] + FEATURES + ['Drying_Time_Hours'])
+    if len(archived): df = pd.concat([archived, df], ignore_index=True) if rows else archived.reset_index(drop=True)
+    df['Species'] = pd.Categorical(df['Species'], categories=known_species)
+    return df
+
+
+def rmse(model, X, y):
+    return float(np.sqrt(np.mean((model.predict(X) - y.to_numpy()) ** 2)))
+
+
+def save_model_atomically(model, model_file=MODEL_FILE):
+    """Dump to a temp file in the same directory, then os.replace() over the live model."""
+    model_dir = os.path.dirname(os.path.abspath(model_file))
+    fd, tmp_path = tempfile.mkstemp(prefix='.drying_model.', suffix='.pkl', dir=model_dir); os.close(fd)
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_file)
+    except Exception:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+
+def refresh_model(log_file=LOG_FILE, actuals_file=ACTUALS_FILE, model_file=MODEL_FILE, category_file=CATEGORY_FILE):
+    """Runs one refresh cycle. Returns the new version string, or None if the live model was kept."""
+    print("Starting online model refresh...")
+
+    # 1. Load the live model
+    try:
+        old_model = joblib.load(model_file)
+        known_species = joblib.load(category_file)
+    except FileNotFoundError:
+        print("ERROR: Model or category files not found.")
+        print("Please run 'train_model.py' first!")
+        return None
+    old_version = get_model_version(old_model)
+    print(f"Live model version: {old_version}")
+
+    # 2. Collect completed jobs
+    df = collect_completed_jobs(known_species, log_file, actuals_file)
+    print(f"Found {len(df)} completed jobs with actual readings.")
+
+    # 3. Fixed holdout; train only on jobs newer than what the live booster has already seen
+    holdout_mask = df['Timestamp'].map(is_holdout).astype(bool)
+    holdout = df[holdout_mask]; train = df[~holdout_mask]
+    trained_jobs = get_trained_jobs(old_model)
+    train = train[~train['Timestamp'].isin(trained_jobs)]
+    print(f"New training jobs: {len(train)} ({len(trained_jobs)} already in {old_version}), holdout jobs: {len(holdout)}")
+    if len(train) < MIN_JOBS:
+        print(f"Not enough new completed jobs to retrain (need at least {MIN_JOBS}). Keeping {old_version}.")
+        return None
+    if holdout.empty:
+        print(f"No holdout jobs to validate against. Keeping {old_version}.")
+        return None
+    X_train, y_train = train[FEATURES], train['Drying_Time_Hours']
+    X_holdout, y_holdout = holdout[FEATURES], holdout['Drying_Time_Hours']
+
+    # 4. Continue training from the live booster
+    # Plain DMatrix on purpose: the sklearn fit() path builds a QuantileDMatrix, and the old trees'
+    # raw split values don't line up with its bins, so the continued gradients come out wrong
+    dtrain = xgb.DMatrix(X_train, label=y_train, enable_categorical=True)
+    booster = xgb.train(old_model.get_xgb_params(), dtrain, num_boost_round=EXTRA_ROUNDS, xgb_model=old_model.get_booster())
+    # Purane early stopping ka best_iteration rahega toh predict() naye trees ignore kar dega
+    booster.set_attr(best_iteration=None, best_score=None)
+    new_model = xgb.XGBRegressor(**old_model.get_params()); new_model.load_model(booster.save_raw())
+
+    # 5. Validate against the holdout
+    old_rmse = rmse(old_model, X_holdout, y_holdout); new_rmse = rmse(new_model, X_holdout, y_holdout)
+    print(f"Holdout RMSE: {old_version} = {old_rmse:.2f} h, refreshed = {new_rmse:.2f} h")
+    if new_rmse >= old_rmse:
+        print(f"Refreshed model is not better. Keeping {old_version}.")
+        return None
+
+    # 6. Stamp the version into the booster and swap it in
+    try: next_number = int(old_version.lstrip('v')) + 1
+    except ValueError: next_number = 1
+    new_version = f"v{next_number}"
+    trained_jobs.update(train['Timestamp'])
+    new_model.get_booster().set_attr(model_version=new_version, trained_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), trained_jobs=json.dumps(sorted(trained_jobs)), trained_rows=str(len(trained_jobs)))
+    save_model_atomically(new_model, model_file)
+    print(f"Model refreshed: {old_version} -> {new_version} (saved to '{model_file}')")
+    return new_version
+
+
+if __name__ == "__main__":
+    # python retrain_model.py            -> ek baar refresh
+    # python retrain_model.py --watch N  -> har N second mein refresh (background process ke liye)
+    if len(sys.argv) >= 2 and sys.argv[1] == '--watch':
+        interval = int(sys.argv[2]) if len(sys.argv) >= 3 else 3600
+        while True:
+            try: refresh_model()
+            except Exception as e: print(f"Error during model refresh: {e}")
+            time.sleep(interval)
+    else:
+        refresh_model()
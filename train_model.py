@@ -1,6 +1,7 @@
 import pandas as pd
 import xgboost as xgb
 import joblib 
+import time
 from sklearn.model_selection import train_test_split
 
 print("Starting model training (v2.2 Fix)...")
@@ -55,6 +56,7 @@ model = xgb.XGBRegressor(
     enable_categorical=True  # --- NEW (v2.2): Tell XGBoost to handle categories ---
 )
 
+fit_start = time.perf_counter() # benchmark.py yeh timing padhta hai (imports aur CSV read ke bina)
 model.fit(
     X_train, y_train,
     eval_set=[(X_test, y_test)], 
@@ -62,6 +64,7 @@ model.fit(
 )
 
 print("Model training complete!")
+print(f"Fit time: {time.perf_counter() - fit_start:.4f} s")
 
 # 6. Save the Model and the Categories
 model_filename = "drying_model.pkl"